@@ -1,542 +1,573 @@
 """
 Admin Panel Web Server for Talaba Bot
-Simple Flask-based admin interface for push notifications
+Async Quart (ASGI) admin interface sharing database.py and the bot's Telegram client
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from quart import Quart, Response, render_template, request, jsonify, redirect, url_for
+import asyncio
+import functools
+import json
 import os
-import sqlite3
-from datetime import date
-import requests
-
-app = Flask(__name__)
+import time
+from datetime import date, datetime, timezone
+from telegram import Bot
+from telegram.request import HTTPXRequest
+import changes
+import database as db
+import jobs
+import outbox
+import routing
+import supervisors
+import tenants
+
+app = Quart(__name__)
 
 # Configuration
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
-DATABASE_PATH = 'talaba.db'
-
-
-def init_db_sync():
-    """Initialize database with tables (sync version for Flask)"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    
-    # Qavatlar jadvali
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS floors (
-            id INTEGER PRIMARY KEY,
-            group_id TEXT,
-            supervisor_id TEXT,
-            supervisor_name TEXT
-        )
-    """)
-    
-    # Xonalar jadvali
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS rooms (
-            number INTEGER PRIMARY KEY,
-            floor INTEGER,
-            duty_days INTEGER DEFAULT 1
-        )
-    """)
-    
-    # Navbat jadvali
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS duty_schedule (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            room_number INTEGER,
-            floor INTEGER,
-            status TEXT DEFAULT 'pending',
-            confirmed_by TEXT,
-            confirmed_at TEXT
-        )
-    """)
-    
-    # Jazolar jadvali
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS penalties (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            room_number INTEGER,
-            type TEXT,
-            reason TEXT,
-            start_date TEXT,
-            end_date TEXT,
-            issued_by TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Talabalar ro'yxati
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id TEXT,
-            name TEXT,
-            room_number INTEGER
-        )
-    """)
-    
-    # Qavat sardorlari
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS floor_supervisors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            telegram_id TEXT UNIQUE,
-            name TEXT,
-            floors TEXT
-        )
-    """)
-    
-    # Davomat jadvali
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            floor INTEGER,
-            student_count INTEGER,
-            submitted_by TEXT,
-            submitted_at TEXT
-        )
-    """)
-    
-    # Navbat navbati (skip qilingan xonalar)
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS duty_queue (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            floor INTEGER,
-            room_number INTEGER,
-            reason TEXT,
-            skipped_by TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    
-    # Agar xonalar yo'q bo'lsa, yaratamiz
-    cursor = conn.execute("SELECT COUNT(*) FROM rooms")
-    count = cursor.fetchone()[0]
-    if count == 0:
-        # Guruh IDlari (user tomonidan kiritilgan)
-        group_ids = {
-            2: '-1003863032013',  # 2-3 qavatlar
-            3: '-1003863032013',
-            4: '-5235799007',      # 4-5 qavatlar
-            5: '-5235799007',
-            6: '-5130425556',      # 6-7 qavatlar
-            7: '-5130425556',
-            8: '-5264518799',      # 8-9 qavatlar
-            9: '-5264518799',
-        }
-        
-        # Qavatlarni yaratish (2-9) bilan group_id
-        for floor_num in range(2, 10):
-            group_id = group_ids.get(floor_num)
-            conn.execute(
-                "INSERT OR IGNORE INTO floors (id, group_id) VALUES (?, ?)", 
-                (floor_num, group_id)
-            )
-        
-        # Xonalarni yaratish
-        for floor_num in range(2, 10):
-            for room_idx in range(1, 13):
-                room_number = floor_num * 100 + room_idx
-                conn.execute(
-                    "INSERT OR IGNORE INTO rooms (number, floor, duty_days) VALUES (?, ?, ?)",
-                    (room_number, floor_num, 1)
-                )
-        conn.commit()
-    
-    conn.close()
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '8'))
+
+# Bot bilan bir xil HTTP klient (httpx) - before_serving da yaratiladi
+telegram_bot = None
+
+# Har bir yotoqxona o'z jobs jadvaliga ega
+job_workers = {}
+
+
+@app.before_serving
+async def startup():
+    """Havzalar, sxema (database.init_db) va fon ishlari - har bir yotoqxona uchun"""
+    global telegram_bot
+
+    await db.init_pool()
+    for state in db.all_tenants():
+        with tenants.use(state.id):
+            await db.init_db()
+            await state.change_feed.poll(force=True)
     print("✅ Database initialized")
 
+    if BOT_TOKEN:
+        api_url = os.getenv('TELEGRAM_API_URL')
+        telegram_bot = Bot(
+            BOT_TOKEN,
+            base_url=f"{api_url.rstrip('/')}/bot" if api_url else "https://api.telegram.org/bot",
+            request=HTTPXRequest(connection_pool_size=BROADCAST_CONCURRENCY),
+        )
+    # Bir vaqtdagi yuborishlar HTTP havzasidan oshmasin; tezlik - panel ulushi (qolgani botga)
+    outbox.start(max_inflight=BROADCAST_CONCURRENCY, global_rate=outbox.PANEL_RATE)
+
+    if os.getenv('JOB_WORKER', '1') == '1':
+        for tenant_id in tenants.ids():
+            worker = jobs.JobWorker(functools.partial(db.connect, tenant_id), tenant_handlers(tenant_id))
+            worker.start()
+            job_workers[tenant_id] = worker
+
 
+@app.after_serving
+async def shutdown():
+    for worker in job_workers.values():
+        await worker.stop()
+    job_workers.clear()
+    await outbox.stop()
+    if telegram_bot is not None:
+        await telegram_bot.shutdown()
+    await db.close_pool()
 
-# Initialize database on startup
-init_db_sync()
 
+# Sahifa/JSON fragmentlari: {yotoqxona: {nom: (versiya, qiymat, o'zgargan vaqt)}}
+_rendered = {}
 
-def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 
+def rendered_cache() -> dict:
+    return _rendered.setdefault(tenants.current_id(), {})
 
-def send_telegram_message(chat_id, text):
-    """Send message via Telegram Bot API"""
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    data = {
-        "chat_id": chat_id,
-        "text": text,
-        "parse_mode": "Markdown"
+
+@app.before_request
+async def select_tenant():
+    """So'rov yotoqxonasi: ?tenant= yoki cookie (aks holda birinchisi)"""
+    tenant_id = request.args.get('tenant') or request.cookies.get('tenant')
+    if tenant_id not in tenants.configs():
+        tenant_id = tenants.default_id()
+    tenants.set_current(tenant_id)
+    # Bot yozuvlari (/setgroup, sardorlar) keshlarni tashlashi uchun
+    await db.tenant().change_feed.poll()
+
+
+@app.context_processor
+def inject_tenants():
+    return {
+        "tenant": tenants.configs()[tenants.current_id()],
+        "tenant_list": list(tenants.configs().values()),
     }
-    try:
-        response = requests.post(url, json=data)
-        return response.json()
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
+
+
+@app.route('/tenant/<tenant_id>')
+async def switch_tenant(tenant_id):
+    """Panelni boshqa yotoqxonaga o'tkazish"""
+    if tenant_id not in tenants.configs():
+        return redirect(url_for('index'))
+    response = redirect(url_for('index'))
+    response.set_cookie('tenant', tenant_id, max_age=365 * 24 * 3600)
+    return response
+
+
+async def broadcast(messages: list, priority: int = outbox.NOTIFY) -> list:
+    """[(chat_id, text)] - outbox limitlari bilan parallel, natijalar shu tartibda"""
+    if telegram_bot is None:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN ko'rsatilmagan")
+    results = await outbox.send_many(telegram_bot, messages, priority, parse_mode='Markdown')
+    return [
+        {
+            "ok": not isinstance(result, Exception),
+            "chat_id": chat_id,
+            "error": str(result) if isinstance(result, Exception) else None,
+        }
+        for (chat_id, _), result in zip(messages, results)
+    ]
+
+
+def broadcast_summary(results):
+    """Broadcast natijasi (ish natijasi sifatida saqlanadi)"""
+    sent = sum(1 for r in results if r['ok'])
+    return {"sent": sent, "results": results}
+
+
+async def enqueue_job(kind, payload=None):
+    """Ishni fon navbatiga qo'yish va darhol javob qaytarish"""
+    async with db.connect() as conn:
+        job_id = await jobs.enqueue(conn, kind, payload)
+    worker = job_workers.get(tenants.current_id())
+    if worker is not None:
+        worker.notify()
+    return jsonify({"success": True, "job_id": job_id, "status": jobs.QUEUED})
+
+
+# ========== HTTP KESH ==========
+
+async def data_version(name: str, scopes, force: bool = False) -> str:
+    """Versiya kaliti - bog'liq scope lar o'zgarmasa (va kun o'tmasa) bir xil"""
+    change_feed = db.tenant().change_feed
+    await change_feed.poll(force=force)
+    scope_versions = ".".join(str(change_feed.version(s)) for s in scopes)
+    return f"{name}-{tenants.current_id()}-{date.today().isoformat()}-{scope_versions}"
+
+
+async def cached_fragment(name: str, version: str, build):
+    """(qiymat, o'zgargan vaqt) - versiya o'zgarmaguncha build() qayta chaqirilmaydi"""
+    cache = rendered_cache()
+    entry = cache.get(name)
+    if entry and entry[0] == version:
+        return entry[1], entry[2]
+    value = await build()
+    modified = datetime.now(timezone.utc).replace(microsecond=0)
+    cache[name] = (version, value, modified)
+    return value, modified
+
+
+async def conditional_response(name: str, scopes, build, make_response):
+    """ETag/Last-Modified: mos kelsa 304, aks holda keshlangan fragmentdan javob"""
+    version = await data_version(name, scopes, force=True)
+    if version in request.if_none_match:
+        response = Response(status=304)
+    else:
+        value, modified = await cached_fragment(name, version, build)
+        response = make_response(value)
+        response.last_modified = modified
+    response.set_etag(version)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return await response.make_conditional(request)
+
+
+def cached_page(*scopes):
+    """Sahifa faqat scope lar o'zgarganda qayta yig'iladi va render qilinadi"""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper():
+            return await conditional_response(view.__name__, scopes, view, Response)
+        return wrapper
+    return decorator
 
 
 @app.route('/')
-def index():
+@cached_page(changes.DUTY, changes.FLOORS)
+async def index():
     """Main dashboard"""
-    conn = get_db()
-    
     # Get today's duties
-    today = date.today().isoformat()
-    duties = conn.execute(
-        "SELECT * FROM duty_schedule WHERE date = ?", (today,)
-    ).fetchall()
-    
-    # Get floors with groups
-    floors = conn.execute("SELECT * FROM floors ORDER BY id").fetchall()
-    
-    # Get recent penalties
-    penalties = conn.execute(
-        "SELECT * FROM penalties ORDER BY created_at DESC LIMIT 10"
-    ).fetchall()
-    
-    conn.close()
-    
-    return render_template('index.html', 
-                          duties=duties, 
-                          floors=floors, 
-                          penalties=penalties,
-                          today=date.today().strftime('%d.%m.%Y'))
+    duties = await db.get_all_today_duties()
+    routes = await db.get_group_routes()
+    topo = await db.get_topology()
+
+    return await render_template('index.html',
+                                 duties=duties,
+                                 groups=routes['groups'],
+                                 floors_label=routing.floors_label(topo.floors),
+                                 today=date.today().strftime('%d.%m.%Y'))
 
 
 @app.route('/send_notification', methods=['POST'])
-def send_notification():
+async def send_notification():
     """Send push notification to groups"""
-    message = request.form.get('message', '')
-    target = request.form.get('target', 'all')  # all, 2-3, 4-5, etc.
-    
+    form = await request.form
+    message = form.get('message', '')
+    target = form.get('target', 'all')  # all, 2-3, 4-5, etc.
+
     if not message:
         return jsonify({"success": False, "error": "Xabar bo'sh!"})
-    
-    conn = get_db()
-    
-    if target == 'all':
-        floors = conn.execute("SELECT DISTINCT group_id FROM floors WHERE group_id IS NOT NULL").fetchall()
-    else:
-        start, end = target.split('-')
-        floors = conn.execute(
-            "SELECT DISTINCT group_id FROM floors WHERE id BETWEEN ? AND ? AND group_id IS NOT NULL",
-            (int(start), int(end))
-        ).fetchall()
-    
-    conn.close()
-    
-    sent = 0
-    for floor in floors:
-        if floor['group_id']:
-            result = send_telegram_message(floor['group_id'], message)
-            if result.get('ok'):
-                sent += 1
-    
-    return jsonify({"success": True, "sent": sent})
+
+    return await enqueue_job('send_notification', {"message": message, "target": target})
+
+
+async def notification_job(payload):
+    """Guruhlarga xabar yuborish (fon ishi)"""
+    message = payload['message']
+    target = payload.get('target', 'all')
+    groups = routing.select(await db.get_group_routes(), target)
+
+    results = await broadcast([(group['group_id'], message) for group in groups])
+    return broadcast_summary(results)
 
 
 @app.route('/send_duty_reminder', methods=['POST'])
-def send_duty_reminder():
+async def send_duty_reminder():
     """Send today's duty reminder to all groups"""
-    conn = get_db()
-    today = date.today().isoformat()
-    
+    return await enqueue_job('send_duty_reminder')
+
+
+async def duty_reminder_job(payload):
+    """Bugungi navbat eslatmasi (fon ishi)"""
     # Avval bugungi navbatlarni yaratish
-    for floor in range(2, 10):
-        existing = conn.execute(
-            "SELECT id FROM duty_schedule WHERE date = ? AND floor = ?",
-            (today, floor)
-        ).fetchone()
-        
-        if not existing:
-            # Navbat yaratish
-            rooms = conn.execute(
-                "SELECT number FROM rooms WHERE floor = ? ORDER BY number",
-                (floor,)
-            ).fetchall()
-            
-            if rooms:
-                room_numbers = [r['number'] for r in rooms]
-                day_of_year = date.today().timetuple().tm_yday
-                floor_offset = (floor - 2) * 3
-                duty_index = (day_of_year + floor_offset) % len(room_numbers)
-                duty_room = room_numbers[duty_index]
-                
-                conn.execute(
-                    """INSERT INTO duty_schedule (date, room_number, floor, status)
-                       VALUES (?, ?, ?, 'pending')""",
-                    (today, duty_room, floor)
-                )
-    
-    conn.commit()
-    
-    # Get groups from database
-    groups = {
-        (2, 3): None,
-        (4, 5): None,
-        (6, 7): None,
-        (8, 9): None,
-    }
-    
-    for floor_range in groups.keys():
-        floor = conn.execute(
-            "SELECT group_id FROM floors WHERE id = ?", (floor_range[0],)
-        ).fetchone()
-        if floor and floor['group_id']:
-            groups[floor_range] = floor['group_id']
-    
-    sent = 0
-    for floors, group_id in groups.items():
-        if not group_id:
-            continue
-        
-        message = f"🏢 **{floors[0]}-{floors[1]} QAVATLAR NAVBATCHILIGI**\n\n"
-        
-        for floor in floors:
-            duty = conn.execute(
-                "SELECT * FROM duty_schedule WHERE date = ? AND floor = ?",
-                (today, floor)
-            ).fetchone()
+    await db.generate_duty_schedule()
+
+    routes = await db.get_group_routes()
+    duties = await db.get_today_duties_by_floor()
+
+    messages = []
+    for group in routes['groups']:
+        message = f"🏢 **{group['label']} QAVATLAR NAVBATCHILIGI**\n\n"
+
+        for floor in group['floors']:
+            duty = duties.get(floor)
             if duty:
                 status = "✅" if duty['status'] == 'completed' else "⏳"
                 message += f"{status} {floor}-qavat: **{duty['room_number']}-xona**\n"
-        
+
         message += f"\n⏰ Deadline: 22:50"
         message += f"\n✅ Bajarilgach sardorga tasdiqlating!"
-        
-        result = send_telegram_message(group_id, message)
-        if result.get('ok'):
-            sent += 1
-    
-    conn.close()
-    return jsonify({"success": True, "sent": sent})
+
+        messages.append((group['group_id'], message))
+
+    return broadcast_summary(await broadcast(messages))
 
 
 @app.route('/add_penalty', methods=['POST'])
-def add_penalty():
+async def add_penalty():
     """Add penalty to a room"""
-    room_number = request.form.get('room_number')
-    days = request.form.get('days', 3)
-    
-    if not room_number:
-        return jsonify({"success": False, "error": "Xona raqami kerak!"})
-    
-    conn = get_db()
-    today = date.today().isoformat()
-    
-    conn.execute(
-        """INSERT INTO penalties (room_number, type, reason, start_date, issued_by)
-           VALUES (?, ?, ?, ?, ?)""",
-        (room_number, f"{days} kun navbatchilik", "Admin panel orqali", today, "admin")
-    )
-    conn.commit()
-    conn.close()
-    
+    form = await request.form
+    if not form.get('room_number'):
+        return jsonify({"success": False, "error": "Xona raqami kerak!"}), 400
+    try:
+        room_number = int(form['room_number'])
+        days = int(form.get('days') or 3)
+    except ValueError:
+        return jsonify({"success": False, "error": "Xona raqami va kunlar soni raqam bo'lishi kerak!"}), 400
+    if days < 1:
+        return jsonify({"success": False, "error": "Kunlar soni kamida 1 bo'lishi kerak!"}), 400
+
+    topo = await db.get_topology()
+    if topo.floor_of(room_number) is None:
+        return jsonify({"success": False, "error": f"{room_number}-xona topilmadi!"}), 400
+
+    await db.add_penalty(room_number, f"{days} kun navbatchilik", "Admin panel orqali",
+                         days, "admin")
     return jsonify({"success": True})
 
 
 @app.route('/api/stats')
-def get_stats():
+async def get_stats():
     """Get statistics"""
-    conn = get_db()
-    today = date.today().isoformat()
-    
-    total_duties = conn.execute(
-        "SELECT COUNT(*) as count FROM duty_schedule WHERE date = ?", (today,)
-    ).fetchone()['count']
-    
-    completed = conn.execute(
-        "SELECT COUNT(*) as count FROM duty_schedule WHERE date = ? AND status = 'completed'", 
-        (today,)
-    ).fetchone()['count']
-    
-    penalties_count = conn.execute(
-        "SELECT COUNT(*) as count FROM penalties"
-    ).fetchone()['count']
-    
-    conn.close()
-    
-    return jsonify({
-        "total_duties": total_duties,
-        "completed": completed,
-        "pending": total_duties - completed,
-        "completion_rate": round(completed / total_duties * 100) if total_duties > 0 else 0,
-        "total_penalties": penalties_count
-    })
+    return await live_json('stats')
+
+
+async def stats_payload() -> dict:
+    """Bugungi navbatchilik/jazo statistikasi (daily_summary dan)"""
+    stats = await db.get_daily_summary()
+    return {
+        "total_duties": stats['duties'],
+        "completed": stats['completed'],
+        "pending": stats['pending'],
+        "completion_rate": stats['completion_rate'],
+        "total_penalties": stats['total_penalties']
+    }
 
 
 # ========== SARDORLAR ==========
 
 @app.route('/sardorlar')
-def sardorlar():
+@cached_page(changes.SUPERVISORS, changes.FLOORS)
+async def sardorlar():
     """Sardorlar boshqaruvi sahifasi"""
-    conn = get_db()
-    supervisors = conn.execute("SELECT * FROM floor_supervisors ORDER BY id").fetchall()
-    conn.close()
-    return render_template('sardorlar.html', 
-                          supervisors=supervisors,
-                          today=date.today().strftime('%d.%m.%Y'))
+    rows = await db.get_all_floor_supervisors()
+    # Qavat tanlovi - guruhlar bo'yicha (floors.group_id), guruhsiz qavatlar alohida
+    routes = await db.get_group_routes()
+    topo = await db.get_topology()
+    return await render_template('sardorlar.html',
+                                 supervisors=rows,
+                                 groups=routes['groups'],
+                                 unassigned=routes['unassigned'],
+                                 buildings=building_summaries(topo),
+                                 today=date.today().strftime('%d.%m.%Y'))
 
 
 @app.route('/add_supervisor', methods=['POST'])
-def add_supervisor():
+async def add_supervisor():
     """Sardor qo'shish"""
-    telegram_id = request.form.get('telegram_id', '').strip()
-    name = request.form.get('name', '').strip()
-    floors = request.form.get('floors', '').strip()
-    
+    form = await request.form
+    telegram_id = form.get('telegram_id', '').strip()
+    name = form.get('name', '').strip()
+    floors = form.get('floors', '').strip()
+
     if not all([telegram_id, name, floors]):
         return jsonify({"success": False, "error": "Barcha maydonlarni to'ldiring!"})
-    
-    conn = get_db()
+
     try:
-        conn.execute(
-            "INSERT OR REPLACE INTO floor_supervisors (telegram_id, name, floors) VALUES (?, ?, ?)",
-            (telegram_id, name, floors)
-        )
-        conn.commit()
+        await db.add_floor_supervisor(telegram_id, name, floors)
     except Exception as e:
-        conn.close()
         return jsonify({"success": False, "error": str(e)})
-    
-    conn.close()
+
     return jsonify({"success": True})
 
 
 @app.route('/delete_supervisor/<int:supervisor_id>', methods=['POST'])
-def delete_supervisor(supervisor_id):
+async def delete_supervisor(supervisor_id):
     """Sardorni o'chirish"""
-    conn = get_db()
-    conn.execute("DELETE FROM floor_supervisors WHERE id = ?", (supervisor_id,))
-    conn.commit()
-    conn.close()
+    await db.delete_floor_supervisor(supervisor_id)
     return jsonify({"success": True})
 
 
 # ========== DAVOMAT ==========
 
 @app.route('/davomat')
-def davomat():
+@cached_page(changes.ATTENDANCE, changes.FLOORS)
+async def davomat():
     """Davomat sahifasi"""
-    conn = get_db()
-    today = date.today().isoformat()
-    
-    attendance = conn.execute(
-        "SELECT * FROM attendance WHERE date = ? ORDER BY floor", (today,)
-    ).fetchall()
-    
+    attendance = await db.get_today_attendance()
+
     # Jami son
-    total = conn.execute(
-        "SELECT SUM(student_count) as total FROM attendance WHERE date = ?", (today,)
-    ).fetchone()['total'] or 0
-    
-    conn.close()
-    return render_template('davomat.html', 
-                          attendance=attendance,
-                          total=total,
-                          today=date.today().strftime('%d.%m.%Y'))
+    total = (await db.get_daily_summary())['students']
+
+    topo = await db.get_topology()
+    return await render_template('davomat.html',
+                                 attendance=attendance,
+                                 total=total,
+                                 floors_total=topo.floor_count,
+                                 floors_label=routing.floors_label(topo.floors),
+                                 today=date.today().strftime('%d.%m.%Y'))
 
 
 @app.route('/api/attendance')
-def api_attendance():
+async def api_attendance():
     """Davomat API"""
-    conn = get_db()
-    today = date.today().isoformat()
-    
-    attendance = conn.execute(
-        "SELECT * FROM attendance WHERE date = ? ORDER BY floor", (today,)
-    ).fetchall()
-    
-    total = conn.execute(
-        "SELECT SUM(student_count) as total FROM attendance WHERE date = ?", (today,)
-    ).fetchone()['total'] or 0
-    
-    conn.close()
-    
-    return jsonify({
-        "attendance": [dict(a) for a in attendance],
+    return await live_json('attendance')
+
+
+async def attendance_payload() -> dict:
+    """Bugungi davomat ro'yxati va jami"""
+    attendance = await db.get_today_attendance()
+    total = (await db.get_daily_summary())['students']
+    floors_total = (await db.get_topology()).floor_count
+
+    return {
+        "attendance": attendance,
         "total": total,
         "floors_submitted": len(attendance),
-        "floors_total": 8
-    })
+        "floors_total": floors_total
+    }
 
 
 # ========== GURUHLAR ==========
 
 @app.route('/guruhlar')
-def guruhlar():
+@cached_page(changes.FLOORS)
+async def guruhlar():
     """Guruhlarni boshqarish sahifasi"""
-    conn = get_db()
-    
-    # Guruhlar ro'yxati
-    groups = []
-    floor_ranges = [(2, 3), (4, 5), (6, 7), (8, 9)]
-    
-    for start, end in floor_ranges:
-        # Birinchi qavatning group_id sini olish
-        floor = conn.execute(
-            "SELECT group_id FROM floors WHERE id = ?", (start,)
-        ).fetchone()
-        
-        groups.append({
-            'floors': f'{start}-{end}',
-            'floor_start': start,
-            'floor_end': end,
-            'group_id': floor['group_id'] if floor else None
-        })
-    
-    conn.close()
-    return render_template('guruhlar.html', 
-                          groups=groups,
-                          today=date.today().strftime('%d.%m.%Y'))
+    # Ulangan guruhlar + guruhsiz qavatlar (har biri alohida)
+    routes = await db.get_group_routes()
+    groups = [
+        {'floors': group['label'], 'group_id': group['group_id']}
+        for group in routes['groups']
+    ]
+    groups += [{'floors': str(floor), 'group_id': None} for floor in routes['unassigned']]
+
+    return await render_template('guruhlar.html',
+                                 groups=groups,
+                                 buildings=building_summaries(await db.get_topology()),
+                                 today=date.today().strftime('%d.%m.%Y'))
+
+
+def building_summaries(topo) -> list:
+    """Binolar: nomi, qavatlar ('2-9') va xonalar soni"""
+    return [
+        dict(building, floors_label=routing.floors_label(building['floors']))
+        for building in topo.building_list()
+    ]
+
+
+@app.route('/add_building', methods=['POST'])
+async def add_building():
+    """Yangi bino (blok) qo'shish: qavatlar, qavatdagi xonalar va glavni uborka xonalari"""
+    form = await request.form
+    name = form.get('name', '').strip()
+    try:
+        floors = supervisors.parse_floors(form.get('floors', ''))
+        rooms_per_floor = int(form.get('rooms_per_floor', ''))
+        # Qavat ichidagi tartib raqamlari (1, 6, 7, 12 -> 201, 206, ...)
+        general_cleaning = supervisors.parse_floors(form.get('general_cleaning', ''))
+    except ValueError:
+        return jsonify({"success": False, "error": "Qavatlar va xonalar soni raqam bo'lishi kerak!"}), 400
+    if not name or not floors:
+        return jsonify({"success": False, "error": "Bino nomi va qavatlarni kiriting!"}), 400
+
+    try:
+        building_id = await db.add_building(name, floors, rooms_per_floor, general_cleaning)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "building_id": building_id})
 
 
 @app.route('/save_group', methods=['POST'])
-def save_group():
+async def save_group():
     """Guruh ID saqlash"""
-    floors = request.form.get('floors', '')
-    group_id = request.form.get('group_id', '').strip()
-    
+    form = await request.form
+    floors = form.get('floors', '')
+    group_id = form.get('group_id', '').strip()
+
     if not floors:
         return jsonify({"success": False, "error": "Qavatlar ko'rsatilmagan!"})
-    
-    start, end = floors.split('-')
-    
-    conn = get_db()
-    for floor in range(int(start), int(end) + 1):
-        conn.execute(
-            "UPDATE floors SET group_id = ? WHERE id = ?",
-            (group_id if group_id else None, floor)
-        )
-    conn.commit()
-    conn.close()
-    
+
+    try:
+        floor_list = supervisors.parse_floors(floors)
+    except ValueError:
+        return jsonify({"success": False, "error": "Qavatlar noto'g'ri!"})
+
+    await db.set_floors_group(floor_list, group_id)
     return jsonify({"success": True})
 
 
 @app.route('/send_test_message', methods=['POST'])
-def send_test_message():
+async def send_test_message():
     """Test xabarini guruhlarga yuborish"""
-    conn = get_db()
-    
-    floor_ranges = [(2, 3), (4, 5), (6, 7), (8, 9)]
-    sent = 0
-    
-    for start, end in floor_ranges:
-        floor = conn.execute(
-            "SELECT group_id FROM floors WHERE id = ?", (start,)
-        ).fetchone()
-        
-        if floor and floor['group_id']:
-            message = f"🧪 **TEST XABARI**\n\n✅ {start}-{end} qavatlar guruhi muvaffaqiyatli ulangan!"
-            result = send_telegram_message(floor['group_id'], message)
-            if result.get('ok'):
-                sent += 1
-    
-    conn.close()
-    return jsonify({"success": True, "sent": sent})
+    return await enqueue_job('send_test_message')
+
+
+async def test_message_job(payload):
+    """Test xabari (fon ishi)"""
+    routes = await db.get_group_routes()
+
+    messages = [
+        (group['group_id'],
+         f"🧪 **TEST XABARI**\n\n✅ {group['label']} qavatlar guruhi muvaffaqiyatli ulangan!")
+        for group in routes['groups']
+    ]
+    # Admin natijani kutib turibdi - navbatdagi e'lonlardan oldin
+    return broadcast_summary(await broadcast(messages, outbox.ADMIN))
+
+
+# ========== FON ISHLARI ==========
+
+@app.route('/api/jobs/<int:job_id>')
+async def api_job(job_id):
+    """Fon ishi holati"""
+    async with db.connect() as conn:
+        job = await jobs.get_job(conn, job_id)
+
+    if not job:
+        return jsonify({"success": False, "error": "Ish topilmadi!"}), 404
+    return jsonify(job)
+
+
+@app.route('/api/changes')
+async def api_changes():
+    """O'zgarishlar lentasi versiyalari (bot bilan umumiy)"""
+    change_feed = db.tenant().change_feed
+    await change_feed.poll(force=True)
+    return jsonify({
+        "version": changes.total_version(change_feed.versions),
+        "versions": change_feed.versions,
+        "duty_cache": db.tenant().duty_cache.stats(),
+    })
+
+
+# ========== JONLI YANGILANISH (SSE) ==========
+
+LIVE_STREAM_SECONDS = int(os.getenv('LIVE_STREAM_SECONDS', '300'))
+LIVE_HEARTBEAT_SECONDS = 15
+LIVE_RETRY_MS = 3000
+
+# Jonli ma'lumot: (yig'uvchi, bog'liq scope lar)
+LIVE_TOPICS = {
+    'attendance': (attendance_payload, (changes.ATTENDANCE, changes.FLOORS)),
+    'stats': (stats_payload, (changes.DUTY,)),
+}
+
+
+async def live_payload(topic: str, version: str) -> dict:
+    """Versiya bo'yicha keshlangan ma'lumot - ochiq oynalar soni bazaga ta'sir qilmaydi"""
+    return (await cached_fragment(topic, version, LIVE_TOPICS[topic][0]))[0]
+
+
+async def live_json(topic: str):
+    """JSON javob + ETag: o'zgarmagan bo'lsa 304 (jadvallar o'qilmaydi)"""
+    return await conditional_response(topic, LIVE_TOPICS[topic][1], LIVE_TOPICS[topic][0], jsonify)
+
+
+@app.route('/api/live')
+async def api_live():
+    """SSE: ?topics=attendance,stats - faqat o'zgarganda yuboriladi"""
+    topics = [t for t in request.args.get('topics', 'attendance,stats').split(',') if t in LIVE_TOPICS]
+    tenant_id = tenants.current_id()
+
+    async def stream():
+        with tenants.use(tenant_id):
+            yield f"retry: {LIVE_RETRY_MS}\n\n"
+            sent = {}
+            started = last_sent = time.monotonic()
+            # Ulanish vaqti cheklangan - brauzer o'zi qayta ulanadi
+            while time.monotonic() - started < LIVE_STREAM_SECONDS:
+                for topic in topics:
+                    # poll() CHANGE_POLL_INTERVAL bilan cheklangan - barcha oqimlarga bitta so'rov
+                    version = await data_version(topic, LIVE_TOPICS[topic][1])
+                    if sent.get(topic) != version:
+                        data = json.dumps(await live_payload(topic, version), ensure_ascii=False)
+                        yield f"event: {topic}\ndata: {data}\n\n"
+                        sent[topic] = version
+                        last_sent = time.monotonic()
+                if time.monotonic() - last_sent >= LIVE_HEARTBEAT_SECONDS:
+                    yield ": ping\n\n"
+                    last_sent = time.monotonic()
+                await asyncio.sleep(1)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+
+JOB_HANDLERS = {
+    'send_notification': notification_job,
+    'send_duty_reminder': duty_reminder_job,
+    'send_test_message': test_message_job,
+}
+
+def tenant_handlers(tenant_id):
+    """Ishlar o'z yotoqxonasi bazasi bilan bajarilishi uchun"""
+    def bind(handler):
+        @functools.wraps(handler)
+        async def run(payload):
+            with tenants.use(tenant_id):
+                return await handler(payload)
+        return run
+    return {kind: bind(handler) for kind, handler in JOB_HANDLERS.items()}
 
 
 if __name__ == '__main__':
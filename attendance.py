@@ -0,0 +1,49 @@
+"""
+Bulk attendance parsing for Talaba Bot
+One message like `2:48 3:51 (202 Botirov)` instead of a dialog per floor
+"""
+
+import re
+
+# qavat:soni, ixtiyoriy (kelmaganlar) - oldingi qavatga tegishli
+ENTRY_RE = re.compile(r"(\d+)\s*:\s*(\d+)(?:\s*\(([^)]*)\))?")
+SEPARATORS_RE = re.compile(r"[\s,;]*")
+
+EXAMPLE = "2:48 3:51 (202 Botirov)"
+
+
+def looks_like_bulk(text: str) -> bool:
+    """Matnda kamida bitta `qavat:soni` bormi"""
+    return bool(text and ENTRY_RE.search(text))
+
+
+def parse_bulk(text: str, allowed_floors) -> list:
+    """[(qavat, soni, izoh)] - xato bo'lsa ValueError (foydalanuvchiga ko'rsatiladigan matn)"""
+    allowed = {int(f) for f in allowed_floors}
+    entries = []
+    seen = set()
+    pos = 0
+    text = (text or '').strip()
+
+    while pos < len(text):
+        pos = SEPARATORS_RE.match(text, pos).end()
+        if pos >= len(text):
+            break
+        match = ENTRY_RE.match(text, pos)
+        if not match:
+            fragment = text[pos:pos + 15].replace('`', '')
+            raise ValueError(f"Tushunarsiz qism: `{fragment}`\nNamuna: `{EXAMPLE}`")
+
+        floor, count = int(match.group(1)), int(match.group(2))
+        notes = (match.group(3) or '').strip() or None
+        if floor not in allowed:
+            raise ValueError(f"{floor}-qavat sizga biriktirilmagan")
+        if floor in seen:
+            raise ValueError(f"{floor}-qavat ikki marta yozilgan")
+        seen.add(floor)
+        entries.append((floor, count, notes))
+        pos = match.end()
+
+    if not entries:
+        raise ValueError(f"Davomat topilmadi. Namuna: `{EXAMPLE}`")
+    return entries
@@ -0,0 +1,106 @@
+"""
+Authorization cache for Talaba Bot
+telegram_id -> role + floor set, reloaded from the change feed
+"""
+
+import logging
+
+import changes
+import database as db
+import tenants
+
+logger = logging.getLogger(__name__)
+
+ADMIN = 'admin'
+SUPERVISOR = 'supervisor'
+
+
+class AuthCache:
+    """Bitta yotoqxona sardorlari va admini - handlerlar uchun xotiradagi ruxsatlar"""
+
+    def __init__(self, state: db.TenantState):
+        self.tenant_id = state.id
+        self.feed = state.change_feed
+        self.admin_id = None
+        self._supervisors = {}
+        self.reloads = 0
+        self.feed.subscribe(changes.SUPERVISORS, self._on_change)
+
+    async def _on_change(self, scope: str):
+        await self.load()
+
+    async def load(self):
+        """Barcha sardorlarni yuklash (post_init da)"""
+        with tenants.use(self.tenant_id):
+            rows = await db.get_all_floor_supervisors()
+        supervisors = {}
+        for row in rows:
+            row['floor_set'] = frozenset(row['floor_list'])
+            supervisors[str(row['telegram_id'])] = row
+
+        self.admin_id = tenants.admin_id(self.tenant_id)
+        self._supervisors = supervisors
+        self.reloads += 1
+        logger.info(f"🔐 Ruxsatlar yuklandi ({self.tenant_id}): {len(supervisors)} ta sardor")
+
+    async def refresh(self, force: bool = False):
+        """Lenta o'zgarish ko'rsatsa qayta yuklanadi (interval ichida - so'rovsiz)"""
+        await self.feed.poll(force)
+
+    def is_admin(self, telegram_id) -> bool:
+        return bool(self.admin_id) and str(telegram_id) == self.admin_id
+
+    def supervisor(self, telegram_id) -> dict:
+        """Sardor yozuvi (floor_list, floor_set bilan) yoki None"""
+        return self._supervisors.get(str(telegram_id))
+
+    def can_manage_floor(self, telegram_id, floor: int) -> bool:
+        supervisor = self._supervisors.get(str(telegram_id))
+        return supervisor is not None and floor in supervisor['floor_set']
+
+    def role(self, telegram_id) -> str:
+        if self.is_admin(telegram_id):
+            return ADMIN
+        if str(telegram_id) in self._supervisors:
+            return SUPERVISOR
+        return None
+
+
+# Yotoqxona bo'yicha keshlar
+_caches = {}
+
+
+def _cache() -> AuthCache:
+    """Joriy yotoqxona keshi"""
+    state = db.tenant()
+    cache = _caches.get(state.id)
+    if cache is None:
+        cache = _caches[state.id] = AuthCache(state)
+    return cache
+
+
+async def load():
+    """Barcha yotoqxonalar ruxsatlarini yuklash (post_init da)"""
+    for tenant_id in tenants.ids():
+        with tenants.use(tenant_id):
+            await _cache().load()
+
+
+async def refresh(force: bool = False):
+    await _cache().refresh(force)
+
+
+def is_admin(telegram_id) -> bool:
+    return _cache().is_admin(telegram_id)
+
+
+def get_supervisor(telegram_id) -> dict:
+    return _cache().supervisor(telegram_id)
+
+
+def can_manage_floor(telegram_id, floor: int) -> bool:
+    return _cache().can_manage_floor(telegram_id, floor)
+
+
+def role(telegram_id) -> str:
+    return _cache().role(telegram_id)
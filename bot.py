@@ -10,11 +10,18 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
     CallbackQueryHandler, filters, ContextTypes,
-    ConversationHandler
+    ConversationHandler, TypeHandler
 )
 from datetime import date
 
+import attendance
+import auth
+import changes
 import database as db
+import outbox
+import tenants
+from persistence import SQLitePersistence
+from update_processor import ChatOrderedUpdateProcessor, UPDATE_CONCURRENCY
 
 # Load environment
 load_dotenv()
@@ -27,72 +34,80 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# ============= SCHEDULE HELPERS =============
+# ============= TENANT =============
 
-def is_general_cleaning_room(room_number: int) -> bool:
-    """1, 6, 7, 12 xonalar glavni uborka qiladi"""
-    room_suffix = room_number % 100
-    return room_suffix in [1, 6, 7, 12]
+# Foydalanuvchi tanlagan yotoqxona (user_data da, persistence bilan saqlanadi)
+TENANT_KEY = 'tenant'
 
 
-async def generate_duty_schedule():
-    """Navbat jadvalini yaratish (12 kunlik davr)"""
-    import aiosqlite
-    today = date.today()
+async def select_tenant(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Update qaysi yotoqxonaga tegishli - keyingi handlerlar shu bazada ishlaydi"""
+    chat = update.effective_chat
+    user = update.effective_user
+    tenant_id = None
     
-    async with aiosqlite.connect(db.DATABASE_PATH) as conn:
-        for floor in range(2, 10):
-            # Avval mavjud jadval bor-yo'qligini tekshirish
-            existing = await conn.execute(
-                "SELECT id FROM duty_schedule WHERE date = ? AND floor = ?",
-                (today.isoformat(), floor)
-            )
-            if await existing.fetchone():
-                continue  # Allaqachon mavjud
-            
-            # 1. Avval queue'dagi xonalarni tekshirish (skip qilinganlar)
-            queued = await db.get_queued_room(floor)
-            if queued:
-                duty_room = queued['room_number']
-                await db.clear_duty_queue(floor, duty_room)
-            else:
-                # 2. Normal hisoblash (offset bilan)
-                cursor = await conn.execute(
-                    "SELECT number, duty_days FROM rooms WHERE floor = ? ORDER BY number",
-                    (floor,)
-                )
-                rooms = await cursor.fetchall()
-                
-                duty_sequence = []
-                for room_num, duty_days in rooms:
-                    duty_sequence.extend([room_num] * duty_days)
-                
-                day_of_year = today.timetuple().tm_yday
-                # Har qavat uchun offset - shunda har qavatda har xil xona
-                floor_offset = (floor - 2) * 3  # 2-qavat: 0, 3-qavat: 3, 4-qavat: 6...
-                duty_index = (day_of_year + floor_offset) % len(duty_sequence)
-                duty_room = duty_sequence[duty_index]
-            
-            await conn.execute(
-                """INSERT INTO duty_schedule (date, room_number, floor, status)
-                   VALUES (?, ?, ?, 'pending')""",
-                (today.isoformat(), duty_room, floor)
-            )
-        
-        await conn.commit()
+    # Guruh - o'zi ulangan yotoqxona
+    if chat and chat.type != 'private':
+        tenant_id = await db.find_tenant(chat_id=chat.id)
+    
+    # Shaxsiy chat: /start <yotoqxona> tanlovi, bo'lmasa sardor/admin yozuvi
+    if tenant_id is None and user:
+        chosen = context.user_data.get(TENANT_KEY)
+        if chosen in tenants.configs():
+            tenant_id = chosen
+        else:
+            tenant_id = await db.find_tenant(user_id=user.id)
+    tenants.set_current(tenant_id or tenants.default_id())
+
+
+def tenant_keyboard() -> list:
+    """Yotoqxona tanlash tugmalari (bittadan ortiq bo'lsa)"""
+    if len(tenants.ids()) < 2:
+        return []
+    current = tenants.current_id()
+    return [
+        [InlineKeyboardButton(
+            f"{'✅' if config['id'] == current else '🏢'} {config['name']}",
+            callback_data=f"tenant_{config['id']}"
+        )]
+        for config in tenants.configs().values()
+    ]
+
+
+def tenant_line() -> str:
+    """Bir nechta yotoqxona bo'lsa - joriysi"""
+    if len(tenants.ids()) < 2:
+        return ""
+    return f"🏢 Yotoqxona: **{tenants.configs()[tenants.current_id()]['name']}**\n\n"
+
+
+def choose_tenant(context: ContextTypes.DEFAULT_TYPE, tenant_id: str):
+    """Foydalanuvchi yotoqxonasini saqlash va joriy update ga qo'llash"""
+    context.user_data[TENANT_KEY] = tenant_id
+    tenants.set_current(tenant_id)
 
 
 # ============= COMMAND HANDLERS =============
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start command - bot haqida"""
+    """Start command - bot haqida (/start <yotoqxona> - yotoqxonani tanlash)"""
     user = update.effective_user
     
+    if context.args:
+        tenant_id = context.args[0]
+        if tenant_id not in tenants.configs():
+            await update.message.reply_text(
+                f"❌ Noma'lum yotoqxona: {tenant_id}\n"
+                f"Mavjudlari: {', '.join(tenants.ids())}"
+            )
+            return
+        choose_tenant(context, tenant_id)
+    
     keyboard = [
         [InlineKeyboardButton("📅 Bugungi navbat", callback_data="today")],
         [InlineKeyboardButton("📋 Jadval", callback_data="schedule")],
         [InlineKeyboardButton("ℹ️ Yordam", callback_data="help")]
-    ]
+    ] + tenant_keyboard()
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await update.message.reply_text(
@@ -102,6 +117,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• Navbatchilik jadvalini boshqarish\n"
         "• Sardorlarga tasdiqlash imkoniyati\n"
         "• Tarbiyachiga kunlik hisobot\n\n"
+        f"{tenant_line()}"
         "Quyidagi tugmalardan foydalaning 👇",
         parse_mode='Markdown',
         reply_markup=reply_markup
@@ -116,10 +132,12 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **Talabalar uchun:**
 /navbat - Bugungi navbatchilar
 /jadval [qavat] - Qavat jadvali
+/start [yotoqxona] - Yotoqxonani tanlash
 
 **Sardorlar uchun:**
 /tasdiqlash [xona] - Navbatchilikni tasdiqlash
 /davomat - Davomat kiritish
+/davomat 2:48 3:51 (202 Botirov) - Bitta xabarda
 
 **Admin uchun:**
 /hisobot - Kunlik hisobot
@@ -138,17 +156,19 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def today_duty(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Bugungi navbatni ko'rsatish"""
     # Avval jadval yaratish
-    await generate_duty_schedule()
+    await db.generate_duty_schedule()
     
     message = f"📅 **BUGUNGI NAVBATCHILAR** - {date.today().strftime('%d.%m.%Y')}\n\n"
     
-    for floor in range(2, 10):
-        duty = await db.get_today_duty(floor)
+    board = await db.get_today_duties_by_floor()
+    topo = await db.get_topology()
+    for floor in topo.floors:
+        duty = board.get(floor)
         if duty:
             status = "✅" if duty['status'] == 'completed' else "⏳"
             room_num = duty['room_number']
             message += f"{status} {floor}-qavat: **{room_num}-xona**"
-            if is_general_cleaning_room(room_num):
+            if duty['general_cleaning']:
                 message += " 🧹 (Glavni uborka)"
             message += "\n"
         else:
@@ -157,6 +177,54 @@ async def today_duty(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(message, parse_mode='Markdown')
 
 
+JADVAL_DAYS = 14
+
+
+async def floor_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Qavatning oldindan tuzilgan navbat jadvali"""
+    if not context.args:
+        await update.message.reply_text(
+            "❌ Qavat raqamini kiriting!\n"
+            "Misol: `/jadval 2`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    try:
+        floor = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text("❌ Noto'g'ri qavat raqami!")
+        return
+    
+    topo = await db.get_topology()
+    if not topo.floor_rooms.get(floor):
+        # Mavjud bo'lmagan qavat uchun bazani o'qimaymiz ham, jadval ham yaratmaymiz
+        await update.message.reply_text(f"❌ {floor}-qavat topilmadi!")
+        return
+    
+    schedule = await db.get_floor_schedule(floor, JADVAL_DAYS)
+    if len(schedule) < JADVAL_DAYS:
+        # Skip/jazodan keyin bekor qilingan kunlarni to'ldirish
+        await db.generate_schedule_horizon(max(JADVAL_DAYS, db.SCHEDULE_HORIZON_DAYS))
+        schedule = await db.get_floor_schedule(floor, JADVAL_DAYS)
+    
+    if not schedule:
+        await update.message.reply_text(f"❌ {floor}-qavat uchun jadval topilmadi!")
+        return
+    
+    message = f"📋 **{floor}-QAVAT JADVALI**\n\n"
+    for duty in schedule:
+        day = date.fromisoformat(duty['date']).strftime('%d.%m')
+        status = "✅" if duty['status'] == 'completed' else "📍"
+        room_num = duty['room_number']
+        message += f"{status} {day}: **{room_num}-xona**"
+        if topo.is_general_cleaning(room_num):
+            message += " 🧹"
+        message += "\n"
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+
+
 async def confirm_duty(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Sardor navbatchilikni tasdiqlaydi"""
     if not context.args:
@@ -186,49 +254,39 @@ async def confirm_duty(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def send_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Guruhlarga navbatchilik xabarini yuborish"""
     user = update.effective_user
-    admin_id = os.getenv('ADMIN_ID')
     
-    if str(user.id) != admin_id:
+    if not auth.is_admin(user.id):
         await update.message.reply_text("❌ Bu buyruq faqat admin uchun!")
         return
     
-    await generate_duty_schedule()
+    await db.generate_duty_schedule()
     
-    groups = {
-        (2, 3): os.getenv('GROUP_2_3'),
-        (4, 5): os.getenv('GROUP_4_5'),
-        (6, 7): os.getenv('GROUP_6_7'),
-        (8, 9): os.getenv('GROUP_8_9'),
-    }
-    
-    sent_count = 0
-    for floors, group_id in groups.items():
-        if not group_id:
-            continue
-            
-        message = f"🏢 **{floors[0]}-{floors[1]} QAVATLAR NAVBATCHILIGI**\n\n"
+    routes = await db.get_group_routes()
+    board = await db.get_today_duties_by_floor()
+    messages = []
+    for group in routes['groups']:
+        message = f"🏢 **{group['label']} QAVATLAR NAVBATCHILIGI**\n\n"
         
-        for floor in floors:
-            duty = await db.get_today_duty(floor)
+        for floor in group['floors']:
+            duty = board.get(floor)
             if duty:
                 room_num = duty['room_number']
                 message += f"📍 {floor}-qavat: **{room_num}-xona**"
-                if is_general_cleaning_room(room_num):
+                if duty['general_cleaning']:
                     message += "\n   🧹 *Bugun xonadagi yashovchilar soni 5 tani tashkil qilgani uchun bugun GLAVNI UBORKA qilasiz!*"
                 message += "\n"
         
         message += f"\n⏰ Deadline: 22:50"
         message += f"\n✅ Bajarilgach sardorga tasdiqlating!"
-        
-        try:
-            await context.bot.send_message(
-                chat_id=group_id,
-                text=message,
-                parse_mode='Markdown'
-            )
+        messages.append((group['group_id'], message))
+    
+    results = await outbox.send_many(context.bot, messages, outbox.NOTIFY, parse_mode='Markdown')
+    sent_count = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Xabar yuborishda xato: {result}")
+        else:
             sent_count += 1
-        except Exception as e:
-            logger.error(f"Xabar yuborishda xato: {e}")
     
     await update.message.reply_text(f"✅ {sent_count} ta guruhga xabar yuborildi!")
 
@@ -270,7 +328,9 @@ async def admin_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         reply_markup = None
     
-    await update.message.reply_text(message, parse_mode='Markdown', reply_markup=reply_markup)
+    # 22:00/23:00 eslatmalari navbatda tursa ham hisobot kutmasin
+    await outbox.send_message(context.bot, update.effective_chat.id, message, outbox.ADMIN,
+                              parse_mode='Markdown', reply_markup=reply_markup)
 
 
 async def set_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -290,14 +350,20 @@ async def set_group(update: Update, context: ContextTypes.DEFAULT_TYPE):
     group_id = str(update.effective_chat.id)
     floors_arg = context.args[0]
     
+    # Bir nechta yotoqxona bo'lsa: /setgroup 2-3 <yotoqxona>
+    if len(context.args) > 1:
+        if context.args[1] not in tenants.configs():
+            await update.message.reply_text(f"❌ Noma'lum yotoqxona: {context.args[1]}")
+            return
+        tenants.set_current(context.args[1])
+    
     if '-' in floors_arg:
         start, end = floors_arg.split('-')
         floors = list(range(int(start), int(end) + 1))
     else:
         floors = [int(floors_arg)]
     
-    for floor in floors:
-        await db.set_floor_group(floor, group_id)
+    await db.set_floors_group(floors, group_id)
     
     await update.message.reply_text(
         f"✅ Bu guruh **{floors_arg}**-qavat(lar) uchun belgilandi!\n"
@@ -353,7 +419,8 @@ async def skip_room(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Sardorligini tekshirish
-    supervisor = await db.get_floor_supervisor_by_telegram(str(user.id))
+    await auth.refresh()
+    supervisor = auth.get_supervisor(user.id)
     if not supervisor:
         await update.message.reply_text(
             "❌ Bu buyruq faqat sardorlar uchun!\n"
@@ -376,11 +443,14 @@ async def skip_room(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     reason = " ".join(context.args[1:]) if len(context.args) > 1 else "Sabab ko'rsatilmagan"
-    floor = room_number // 100
+    topo = await db.get_topology()
+    floor = topo.floor_of(room_number)
+    if floor is None:
+        await update.message.reply_text(f"❌ {room_number}-xona topilmadi!")
+        return
     
     # Sardor bu qavatga mas'ul ekanligini tekshirish
-    supervisor_floors = supervisor['floors'].split(',')
-    if str(floor) not in supervisor_floors:
+    if floor not in supervisor['floor_set']:
         await update.message.reply_text(
             f"❌ Siz {floor}-qavat sardori emassiz!\n"
             f"Sizning qavatlaringiz: {supervisor['floors']}"
@@ -395,13 +465,13 @@ async def skip_room(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Bugungi navbatni yangilash
     today = date.today().isoformat()
-    import aiosqlite
-    async with aiosqlite.connect(db.DATABASE_PATH) as conn:
+    async with db.connect() as conn:
         await conn.execute(
             "UPDATE duty_schedule SET room_number = ? WHERE date = ? AND floor = ?",
             (next_room, today, floor)
         )
         await conn.commit()
+    db.tenant().duty_cache.invalidate(today)
     
     await update.message.reply_text(
         f"✅ **Xona o'tkazildi!**\n\n"
@@ -420,15 +490,17 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await query.answer()
     
     if query.data == "today":
-        await generate_duty_schedule()
+        await db.generate_duty_schedule()
         message = f"📅 **BUGUNGI NAVBATCHILAR**\n\n"
-        for floor in range(2, 10):
-            duty = await db.get_today_duty(floor)
+        board = await db.get_today_duties_by_floor()
+        topo = await db.get_topology()
+        for floor in topo.floors:
+            duty = board.get(floor)
             if duty:
                 status = "✅" if duty['status'] == 'completed' else "⏳"
                 room_num = duty['room_number']
                 message += f"{status} {floor}-qavat: **{room_num}-xona**"
-                if is_general_cleaning_room(room_num):
+                if duty['general_cleaning']:
                     message += " 🧹 (Glavni uborka)"
                 message += "\n"
         await query.edit_message_text(message, parse_mode='Markdown')
@@ -481,64 +553,101 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     elif query.data == "dismiss_report":
         await query.edit_message_text("✅ Hisobot yopildi.")
+    
+    elif query.data.startswith("tenant_"):
+        tenant_id = query.data[len("tenant_"):]
+        if tenant_id not in tenants.configs():
+            await query.edit_message_text("❌ Bunday yotoqxona endi yo'q.")
+            return
+        choose_tenant(context, tenant_id)
+        await query.edit_message_text(
+            f"🏢 Yotoqxona: **{tenants.configs()[tenant_id]['name']}**\n\n"
+            "/navbat, /jadval va boshqa buyruqlar endi shu yotoqxona uchun.",
+            parse_mode='Markdown'
+        )
 
 
 # ============= MAIN =============
 
+# Handlerlar faqat xabar va inline tugmalarni ishlatadi
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
 async def post_init(application):
     """Bot ishga tushganda"""
-    await db.init_db()
-    logger.info("✅ Database initialized")
-    logger.info("🤖 Talaba Bot tayyor!")
+    await db.init_pool()
+    # Bot token limitining admin panelga qoldirilmagan qismi
+    outbox.start(global_rate=outbox.BOT_RATE)
+    for state in db.all_tenants():
+        with tenants.use(state.id):
+            await db.init_db()
+            await state.change_feed.poll(force=True)
+            inserted = await db.generate_schedule_horizon()
+        logger.info(f"✅ {state.name}: baza tayyor, jadval {db.SCHEDULE_HORIZON_DAYS} kunga (+{inserted})")
+    await auth.load()
+    logger.info(f"🤖 Talaba Bot tayyor! (yotoqxonalar: {len(tenants.ids())}, pool: {db.POOL_SIZE})")
+
+
+async def post_shutdown(application):
+    """Bot to'xtaganda"""
+    await outbox.stop()
+    await db.close_pool()
+    logger.info("🔌 Database pool yopildi")
 
 
 # ============= SCHEDULED JOBS =============
 
+async def extend_schedule_horizon(context: ContextTypes.DEFAULT_TYPE):
+    """00:05 - Oldindan tuzilgan jadvalni yana bir kunga uzaytirish"""
+    inserted = await db.generate_schedule_horizon()
+    logger.info(f"📋 Jadval uzaytirildi: +{inserted} ta navbat")
+
+
+async def poll_changes(context: ContextTypes.DEFAULT_TYPE):
+    """Admin panel yozuvlarini sezish (keshlar o'z-o'zidan yangilanadi)"""
+    state = db.tenant()
+    changed = await state.change_feed.poll(force=True)
+    if changed:
+        logger.info(f"🔄 O'zgarishlar ({state.id}): {', '.join(changed)}")
+
+
 async def send_attendance_reminder_22(context: ContextTypes.DEFAULT_TYPE):
     """22:00 - Sardorlarga birinchi davomat eslatmasi"""
-    supervisors = await db.get_all_supervisors()
+    supervisors = await db.get_all_floor_supervisors()
     
-    for sup in supervisors:
-        try:
-            await context.bot.send_message(
-                chat_id=sup['telegram_id'],
-                text="📊 **DAVOMAT VAQTI!**\n\n"
-                     f"Hurmatli {sup['name']}!\n"
-                     "23:00 gacha davomatni kiriting.\n\n"
-                     "Kiritish uchun: /davomat",
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            logger.error(f"22:00 eslatma xatosi: {e}")
+    messages = [
+        (sup['telegram_id'],
+         "📊 **DAVOMAT VAQTI!**\n\n"
+         f"Hurmatli {sup['name']}!\n"
+         "23:00 gacha davomatni kiriting.\n\n"
+         "Kiritish uchun: /davomat")
+        for sup in supervisors
+    ]
+    results = await outbox.send_many(context.bot, messages, outbox.REMINDER, parse_mode='Markdown')
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"22:00 eslatma xatosi: {result}")
 
 
 async def send_attendance_reminder_23(context: ContextTypes.DEFAULT_TYPE):
     """23:00 - Kiritmaganlar uchun ikkinchi eslatma"""
-    supervisors = await db.get_all_supervisors()
     today = date.today().isoformat()
     
-    for sup in supervisors:
-        # Bu sardor kiritganmi tekshirish
-        floors = sup['floors'].split(',')
-        not_submitted = []
-        
-        for floor in floors:
-            attendance = await db.get_floor_attendance_for_date(int(floor), today)
-            if not attendance:
-                not_submitted.append(floor)
-        
-        if not_submitted:
-            try:
-                await context.bot.send_message(
-                    chat_id=sup['telegram_id'],
-                    text="⚠️ **DAVOMAT KIRITILMAGAN!**\n\n"
-                         f"Hurmatli {sup['name']}!\n"
-                         f"Qavatlar: {', '.join(not_submitted)}\n\n"
-                         "Iltimos, hozir kiriting: /davomat",
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"23:00 eslatma xatosi: {e}")
+    # Kiritilmagan qavatlari bor sardorlar (bitta so'rov)
+    missing = await db.get_missing_attendance(today)
+    
+    messages = [
+        (sup['telegram_id'],
+         "⚠️ **DAVOMAT KIRITILMAGAN!**\n\n"
+         f"Hurmatli {sup['name']}!\n"
+         f"Qavatlar: {', '.join(map(str, sup['missing_floors']))}\n\n"
+         "Iltimos, hozir kiriting: /davomat")
+        for sup in missing
+    ]
+    
+    results = await outbox.send_many(context.bot, messages, outbox.REMINDER, parse_mode='Markdown')
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"23:00 eslatma xatosi: {result}")
 
 
 # ============= ATTENDANCE CONVERSATION =============
@@ -548,7 +657,8 @@ SELECTING_FLOOR, ENTERING_COUNT, ENTERING_NOTES = range(3)
 async def start_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Davomat kiritishni boshlash"""
     user = update.effective_user
-    supervisor = await db.get_floor_supervisor_by_telegram(str(user.id))
+    await auth.refresh()
+    supervisor = auth.get_supervisor(user.id)
     
     if not supervisor:
         await update.message.reply_text(
@@ -557,18 +667,23 @@ async def start_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return ConversationHandler.END
     
-    floors = supervisor['floors'].split(',')
+    floors = [str(f) for f in supervisor['floor_list']]
     context.user_data['floors_to_submit'] = floors
     context.user_data['submitted_floors'] = []
     context.user_data['supervisor_name'] = supervisor['name']
     
+    # /davomat 2:48 3:51 (202 Botirov) - hammasi bitta xabarda
+    if context.args:
+        return await save_bulk_attendance(update, context, " ".join(context.args))
+    
     keyboard = [[InlineKeyboardButton(f"{f}-qavat", callback_data=f"att_floor_{f}")] for f in floors]
     
     await update.message.reply_text(
         f"📊 **DAVOMAT KIRITISH**\n\n"
         f"👤 Sardor: {supervisor['name']}\n"
         f"🏢 Qavatlar: {supervisor['floors']}\n\n"
-        "Qaysi qavat uchun kiritasiz? 👇",
+        "Qaysi qavat uchun kiritasiz? 👇\n"
+        f"Yoki bitta xabarda: `{attendance.EXAMPLE}`",
         parse_mode='Markdown',
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
@@ -596,6 +711,9 @@ async def count_entered(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         count = int(update.message.text)
     except ValueError:
+        if attendance.looks_like_bulk(update.message.text):
+            # Xato bo'lsa shu qavat soni kutilishda qoladi
+            return await save_bulk_attendance(update, context, update.message.text, ENTERING_COUNT)
         await update.message.reply_text("❌ Faqat son kiriting!")
         return ENTERING_COUNT
     
@@ -681,6 +799,48 @@ async def notes_skipped(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
 
 
+async def bulk_entered(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Qavat tanlash o'rniga bitta xabarda davomat"""
+    return await save_bulk_attendance(update, context, update.message.text)
+
+
+async def save_bulk_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str,
+                               retry_state: int = SELECTING_FLOOR):
+    """`2:48 3:51 (202 Botirov)` - barcha qavatlar bitta tranzaksiyada (xato bo'lsa - retry_state)"""
+    floors_to_submit = context.user_data['floors_to_submit']
+    supervisor_name = context.user_data['supervisor_name']
+    try:
+        entries = attendance.parse_bulk(text, floors_to_submit)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}", parse_mode='Markdown')
+        return retry_state
+    
+    await db.save_attendance_bulk(entries, supervisor_name)
+    
+    submitted = context.user_data['submitted_floors']
+    submitted.extend(str(floor) for floor, _, _ in entries if str(floor) not in submitted)
+    remaining = [f for f in floors_to_submit if f not in submitted]
+    
+    lines = [
+        f"✅ **{floor}-qavat:** {count} ta" + (" 📝" if notes else " (hamma kelgan)")
+        for floor, count, notes in entries
+    ]
+    if remaining:
+        keyboard = [[InlineKeyboardButton(f"{f}-qavat", callback_data=f"att_floor_{f}")] for f in remaining]
+        await update.message.reply_text(
+            "\n".join(lines) + "\n\nKeyingi qavat uchun tanlang 👇",
+            parse_mode='Markdown',
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return SELECTING_FLOOR
+    
+    await update.message.reply_text(
+        "\n".join(lines) + f"\n\n✅ **Davomat kiritildi!**\n\nRahmat, {supervisor_name}! 🎉",
+        parse_mode='Markdown'
+    )
+    return ConversationHandler.END
+
+
 async def cancel_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Bekor qilish"""
     await update.message.reply_text("❌ Bekor qilindi.")
@@ -690,32 +850,33 @@ async def cancel_attendance(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def test_attendance_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Test uchun davomat so'rovini yuborish (admin uchun)"""
     user = update.effective_user
-    admin_id = os.getenv('ADMIN_ID')
     
-    if str(user.id) != admin_id:
+    if not auth.is_admin(user.id):
         await update.message.reply_text("❌ Bu buyruq faqat admin uchun!")
         return
     
     supervisors = await db.get_all_floor_supervisors()
-    sent = 0
     
+    messages = []
     for sup in supervisors:
-        floors = sup['floors'].split(',')
+        floors = sup['floor_list']
         keyboard = [[InlineKeyboardButton(f"{f}-qavat", callback_data=f"att_floor_{f}")] for f in floors]
-        
-        try:
-            await context.bot.send_message(
-                chat_id=sup['telegram_id'],
-                text=f"📊 **DAVOMAT VAQTI!**\n\n"
-                     f"Assalomu alaykum, {sup['name']}!\n"
-                     f"Iltimos, qavatlaringiz uchun talabalar sonini kiriting.\n\n"
-                     "Qavat tanlang 👇",
-                parse_mode='Markdown',
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
+        messages.append((
+            sup['telegram_id'],
+            f"📊 **DAVOMAT VAQTI!**\n\n"
+            f"Assalomu alaykum, {sup['name']}!\n"
+            f"Iltimos, qavatlaringiz uchun talabalar sonini kiriting.\n\n"
+            "Qavat tanlang 👇",
+            {"reply_markup": InlineKeyboardMarkup(keyboard)}
+        ))
+    
+    results = await outbox.send_many(context.bot, messages, outbox.REMINDER, parse_mode='Markdown')
+    sent = 0
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Davomat so'rovi yuborishda xato: {result}")
+        else:
             sent += 1
-        except Exception as e:
-            logger.error(f"Davomat so'rovi yuborishda xato: {e}")
     
     await update.message.reply_text(f"✅ {sent} ta sardorga davomat so'rovi yuborildi!")
 
@@ -753,7 +914,22 @@ def main():
         return
     
     # Create application WITH job_queue
-    app = Application.builder().token(token).post_init(post_init).build()
+    builder = (
+        Application.builder()
+        .token(token)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        # Davomat suhbati va user_data qayta ishga tushishda yo'qolmaydi
+        .persistence(SQLitePersistence())
+    )
+    if UPDATE_CONCURRENCY > 1:
+        # Turli sardorlar parallel, bitta chat ichida tartib saqlanadi
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(UPDATE_CONCURRENCY))
+    api_url = os.getenv('TELEGRAM_API_URL')
+    if api_url:
+        # Lokal sinov (webhook_harness.py) uchun soxta Bot API
+        builder = builder.base_url(f"{api_url.rstrip('/')}/bot")
+    app = builder.build()
     
     # Scheduled jobs (Toshkent vaqti - UTC+5)
     tz = pytz.timezone('Asia/Tashkent')
@@ -761,23 +937,42 @@ def main():
     if app.job_queue:
         # 22:00 - Birinchi eslatma
         app.job_queue.run_daily(
-            send_attendance_reminder_22,
+            db.per_tenant(send_attendance_reminder_22),
             time=dt_time(hour=22, minute=0, tzinfo=tz),
             name="attendance_22"
         )
         # 23:00 - Ikkinchi eslatma (kiritmaganlar uchun)
         app.job_queue.run_daily(
-            send_attendance_reminder_23,
+            db.per_tenant(send_attendance_reminder_23),
             time=dt_time(hour=23, minute=0, tzinfo=tz),
             name="attendance_23"
         )
-        logger.info("⏰ Scheduled jobs: 22:00, 23:00 davomat eslatmalari")
+        # 00:05 - Jadvalni oldindan tuzish
+        app.job_queue.run_daily(
+            db.per_tenant(extend_schedule_horizon),
+            time=dt_time(hour=0, minute=5, tzinfo=tz),
+            name="schedule_horizon"
+        )
+        # Jarayonlararo o'zgarishlar lentasi
+        app.job_queue.run_repeating(
+            db.per_tenant(poll_changes),
+            interval=changes.CHANGE_POLL_INTERVAL,
+            first=changes.CHANGE_POLL_INTERVAL,
+            name="change_feed"
+        )
+        logger.info("⏰ Scheduled jobs: 22:00, 23:00 davomat eslatmalari, 00:05 jadval")
+    
+    # Har bir update avval o'z yotoqxonasiga biriktiriladi
+    app.add_handler(TypeHandler(Update, select_tenant), group=-1)
     
     # Attendance ConversationHandler
     attendance_conv = ConversationHandler(
         entry_points=[CommandHandler("davomat", start_attendance)],
         states={
-            SELECTING_FLOOR: [CallbackQueryHandler(floor_selected, pattern=r"^att_floor_")],
+            SELECTING_FLOOR: [
+                CallbackQueryHandler(floor_selected, pattern=r"^att_floor_"),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, bulk_entered),
+            ],
             ENTERING_COUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, count_entered)],
             ENTERING_NOTES: [
                 MessageHandler(filters.TEXT & ~filters.COMMAND, notes_entered),
@@ -785,6 +980,8 @@ def main():
             ],
         },
         fallbacks=[CommandHandler("bekor", cancel_attendance)],
+        name="attendance",
+        persistent=True,
     )
     app.add_handler(attendance_conv)
     
@@ -794,6 +991,7 @@ def main():
     app.add_handler(CommandHandler("yordam", help_command))
     app.add_handler(CommandHandler("navbat", today_duty))
     app.add_handler(CommandHandler("bugun", today_duty))
+    app.add_handler(CommandHandler("jadval", floor_schedule))
     app.add_handler(CommandHandler("tasdiqlash", confirm_duty))
     app.add_handler(CommandHandler("xabar", send_notifications))
     app.add_handler(CommandHandler("hisobot", admin_report))
@@ -807,8 +1005,31 @@ def main():
     # Callbacks
     app.add_handler(CallbackQueryHandler(button_callback))
     
-    logger.info("🤖 Talaba Bot ishga tushdi!")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    if os.getenv('BOT_MODE', 'polling') == 'webhook':
+        run_webhook(app, token)
+    else:
+        logger.info("🤖 Talaba Bot ishga tushdi! (polling)")
+        app.run_polling(allowed_updates=ALLOWED_UPDATES)
+
+
+def run_webhook(app, token: str):
+    """Webhook rejimi - Telegram update larni o'zi yuboradi (getUpdates sikli yo'q)"""
+    base_url = os.getenv('WEBHOOK_URL')
+    if not base_url:
+        logger.error("WEBHOOK_URL not found!")
+        return
+    
+    url_path = os.getenv('WEBHOOK_PATH', 'telegram')
+    port = int(os.getenv('PORT', '8443'))
+    logger.info(f"🤖 Talaba Bot ishga tushdi! (webhook :{port}/{url_path})")
+    app.run_webhook(
+        listen=os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+        port=port,
+        url_path=url_path,
+        webhook_url=f"{base_url.rstrip('/')}/{url_path}",
+        secret_token=os.getenv('WEBHOOK_SECRET'),
+        allowed_updates=ALLOWED_UPDATES,
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+"""
+Cross-process change feed for Talaba Bot
+Per-scope counters in change_versions (bumped by triggers), polled by bot and admin panel
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+CHANGE_POLL_INTERVAL = float(os.getenv('CHANGE_POLL_INTERVAL', '5'))
+
+# Scope lar (migrations.py dagi triggerlar bilan bir xil)
+SUPERVISORS = 'supervisors'
+FLOORS = 'floors'
+DUTY = 'duty'
+ATTENDANCE = 'attendance'
+
+VERSIONS_SQL = "SELECT scope, version FROM change_versions"
+
+
+async def versions(conn) -> dict:
+    """{scope: version}"""
+    cursor = await conn.execute(VERSIONS_SQL)
+    return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+def total_version(current: dict) -> int:
+    """Barcha scope lar bo'yicha umumiy hisoblagich (faqat o'sadi)"""
+    return sum(current.values())
+
+
+class AsyncChangeFeed:
+    """Versiyalarni so'rab, o'zgargan scope obunachilarini chaqirish (connect - async context manager)"""
+
+    def __init__(self, connect, interval: float = None):
+        self.connect = connect
+        self.interval = interval or CHANGE_POLL_INTERVAL
+        self.versions = {}
+        self._subscribers = {}
+        self._primed = False
+        self._polled_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def subscribe(self, scope: str, callback):
+        """callback(scope) - scope o'zgarganda chaqiriladi (oddiy yoki async)"""
+        self._subscribers.setdefault(scope, []).append(callback)
+
+    def version(self, scope: str) -> int:
+        return self.versions.get(scope, 0)
+
+    def _due(self, force: bool) -> bool:
+        return force or time.monotonic() - self._polled_at >= self.interval
+
+    def _diff(self, current: dict) -> list:
+        """Yangi versiyalarni saqlab, o'zgargan scope lar ro'yxatini qaytarish"""
+        changed = [] if not self._primed else [
+            scope for scope, version in current.items() if self.versions.get(scope) != version
+        ]
+        self.versions = current
+        self._primed = True
+        self._polled_at = time.monotonic()
+        return changed
+
+    async def poll(self, force: bool = False) -> list:
+        """O'zgargan scope lar (interval ichida - so'rovsiz, bo'sh ro'yxat)"""
+        if not self._due(force):
+            return []
+        async with self._lock:
+            if not self._due(force):
+                return []
+            async with self.connect() as db:
+                changed = self._diff(await versions(db))
+
+        for scope in changed:
+            for callback in self._subscribers.get(scope, []):
+                try:
+                    result = callback(scope)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception(f"'{scope}' obunachisi xato bilan tugadi")
+        return changed
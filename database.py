@@ -3,166 +3,403 @@ Database module for Talaba Bot
 SQLite database for storing rooms, schedules, and penalties
 """
 
+import asyncio
 import aiosqlite
+import functools
+import logging
 import os
-from datetime import datetime, date
+import time
+import changes
+import duty_engine
+import migrations
+import routing
+import summary
+import supervisors
+import tenants
+import topology
+from contextlib import asynccontextmanager
+from datetime import datetime, date, timedelta
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '4'))
+DUTY_CACHE_TTL = int(os.getenv('DUTY_CACHE_TTL', '300'))
+SCHEDULE_HORIZON_DAYS = int(os.getenv('SCHEDULE_HORIZON_DAYS', '30'))
+
+# Har bir ulanishga bir marta qo'llaniladigan sozlamalar
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+# ========== Connection Pool ==========
+
+class ConnectionPool:
+    """Uzoq yashovchi aiosqlite ulanishlar havzasi"""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = max(1, size)
+        self._idle = asyncio.Queue()
+        self._connections = []
+
+    async def open(self):
+        """Ulanishlarni ochish va PRAGMA larni qo'llash"""
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.path)
+            conn.row_factory = aiosqlite.Row
+            for pragma in CONNECTION_PRAGMAS:
+                await conn.execute(pragma)
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Bo'sh ulanishni olish (ish tugagach havzaga qaytariladi)"""
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            # Tugallanmagan tranzaksiya keyingi foydalanuvchiga o'tmasin
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        """Barcha ulanishlarni yopish"""
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+
+
+# ========== Tenants ==========
+
+class TenantState:
+    """Bitta yotoqxona: o'z bazasi, havzasi va keshlari"""
+
+    def __init__(self, config: dict):
+        self.id = config['id']
+        self.name = config['name']
+        self.path = config['db']
+        self.pool = None
+        self.duty_cache = DutyCache(DUTY_CACHE_TTL)
+        self.group_routes = None
+        self.topology = None
+
+        # Boshqa jarayon (admin panel) yozuvlarini sezish uchun
+        self.change_feed = changes.AsyncChangeFeed(functools.partial(connect, self.id))
+        self.change_feed.subscribe(changes.DUTY, lambda scope: self.duty_cache.invalidate())
+        self.change_feed.subscribe(changes.FLOORS, self.invalidate_floors)
+        self.change_feed.subscribe(changes.SUPERVISORS, lambda scope: invalidate_chat_index())
+
+    @property
+    def admin_id(self) -> str:
+        return tenants.admin_id(self.id)
+
+    def invalidate_floors(self, scope: str = None):
+        self.group_routes = None
+        self.topology = None
+        invalidate_chat_index()
+
+
+_states = {}
+
+
+def tenant(tenant_id: str = None) -> TenantState:
+    """Yotoqxona holati (ko'rsatilmasa - joriy kontekstdagi)"""
+    tenant_id = tenant_id or tenants.current_id()
+    state = _states.get(tenant_id)
+    if state is None:
+        state = _states[tenant_id] = TenantState(tenants.configs()[tenant_id])
+    return state
+
+
+def all_tenants() -> list:
+    return [tenant(tenant_id) for tenant_id in tenants.ids()]
+
+
+def per_tenant(func):
+    """Rejali ishni har bir yotoqxona uchun alohida bajarish"""
+    @functools.wraps(func)
+    async def run(*args, **kwargs):
+        for tenant_id in tenants.ids():
+            with tenants.use(tenant_id):
+                try:
+                    await func(*args, **kwargs)
+                except Exception:
+                    logger.exception(f"{func.__name__} ({tenant_id}) xato bilan tugadi")
+    return run
+
+
+async def init_pool(size: int = None):
+    """Har bir yotoqxona havzasini yaratish (bot post_init da bir marta)"""
+    for state in all_tenants():
+        if state.pool is None:
+            pool = ConnectionPool(state.path, size or POOL_SIZE)
+            await pool.open()
+            state.pool = pool
+
+
+async def close_pool():
+    """Havzalarni yopish (bot to'xtaganda)"""
+    for state in _states.values():
+        logger.info(f"📦 Navbat keshi [{state.id}]: {state.duty_cache.stats()}")
+        if state.pool is not None:
+            await state.pool.close()
+            state.pool = None
+
+
+@asynccontextmanager
+async def connect(tenant_id: str = None):
+    """Ulanish olish - havza ochilgan bo'lsa undan, aks holda vaqtinchalik"""
+    state = tenant(tenant_id)
+    if state.pool is not None:
+        async with state.pool.acquire() as conn:
+            yield conn
+        return
+
+    async with aiosqlite.connect(state.path) as conn:
+        conn.row_factory = aiosqlite.Row
+        yield conn
+
+
+# Chat/foydalanuvchi -> yotoqxona (guruhlar, sardorlar va adminlardan)
+_chat_index = None
+
+
+async def _load_chat_index() -> dict:
+    owners = {}
+    for state in all_tenants():
+        routes = await get_group_routes(state.id)
+        keys = [group['group_id'] for group in routes['groups']]
+        async with connect(state.id) as db:
+            cursor = await db.execute("SELECT telegram_id FROM floor_supervisors")
+            keys += [row[0] for row in await cursor.fetchall()]
+        # Faqat shu yotoqxonaga yozilgan admin - umumiy ADMIN_ID hammasiga tegishli
+        own_admin = tenants.configs()[state.id].get('admin_id')
+        if own_admin:
+            keys.append(own_admin)
+        for key in keys:
+            owners.setdefault(str(key), set()).add(state.id)
+    # Bir nechta yotoqxonada uchraganlar - foydalanuvchi tanlovi bo'yicha (/start <yotoqxona>)
+    return {key: ids.pop() for key, ids in owners.items() if len(ids) == 1}
+
+
+async def find_tenant(chat_id=None, user_id=None) -> str:
+    """Chat yoki foydalanuvchi yotoqxonasi (topilmasa yoki bir nechta bo'lsa - None)"""
+    ids = tenants.ids()
+    if len(ids) == 1:
+        return ids[0]
 
-DATABASE_PATH = "talaba.db"
+    global _chat_index
+    if _chat_index is None:
+        _chat_index = await _load_chat_index()
+    for key in (chat_id, user_id):
+        if key is not None and str(key) in _chat_index:
+            return _chat_index[str(key)]
+    return None
+
+
+def invalidate_chat_index():
+    global _chat_index
+    _chat_index = None
 
 
 async def init_db():
-    """Initialize database with tables"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Qavatlar jadvali
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS floors (
-                id INTEGER PRIMARY KEY,
-                group_id TEXT,
-                supervisor_id TEXT,
-                supervisor_name TEXT
-            )
-        """)
-        
-        # Xonalar jadvali
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                number INTEGER PRIMARY KEY,
-                floor INTEGER,
-                duty_days INTEGER DEFAULT 1,
-                FOREIGN KEY (floor) REFERENCES floors(id)
-            )
-        """)
-        
-        # Navbat jadvali
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS duty_schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                room_number INTEGER,
-                floor INTEGER,
-                status TEXT DEFAULT 'pending',
-                confirmed_by TEXT,
-                confirmed_at TEXT,
-                FOREIGN KEY (room_number) REFERENCES rooms(number)
-            )
-        """)
-        
-        # Jazolar jadvali
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS penalties (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                room_number INTEGER,
-                type TEXT,
-                reason TEXT,
-                start_date TEXT,
-                end_date TEXT,
-                issued_by TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (room_number) REFERENCES rooms(number)
-            )
-        """)
-        
-        # Talabalar ro'yxati (ixtiyoriy)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id TEXT,
-                name TEXT,
-                room_number INTEGER,
-                FOREIGN KEY (room_number) REFERENCES rooms(number)
-            )
-        """)
-        
-        # Qavat sardorlari (davomat uchun)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS floor_supervisors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id TEXT UNIQUE,
-                name TEXT,
-                floors TEXT
-            )
-        """)
+    """Sxema (migrations.py) va boshlang'ich ma'lumotlar - versiya joyida bo'lsa darhol qaytadi"""
+    async with connect() as db:
+        if await migrations.is_current(db):
+            return
         
-        # Davomat jadvali
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                floor INTEGER,
-                student_count INTEGER,
-                notes TEXT,
-                submitted_by TEXT,
-                submitted_at TEXT
-            )
-        """)
+        # Jadvallar, indekslar va boshqa sxema o'zgarishlari
+        await migrations.ensure(db)
         
-        # Navbat navbati (skip qilingan xonalar)
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS duty_queue (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                floor INTEGER,
-                room_number INTEGER,
-                reason TEXT,
-                skipped_by TEXT,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        # Agar xonalar yo'q bo'lsa, yaratamiz (ikkinchi jarayon bilan bir vaqtda emas)
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute("SELECT 1 FROM rooms LIMIT 1")
+        if await cursor.fetchone() is None:
+            await seed_data(db)
+        else:
+            await db.rollback()
         
+        await backfill_legacy_groups(db)
+        await migrations.mark_current(db)
+
+
+# floors.group_id dan oldingi .env sozlamasi (GROUP_2_3 ...) - faqat asosiy yotoqxona
+LEGACY_GROUP_ENV = {
+    'GROUP_2_3': (2, 3),
+    'GROUP_4_5': (4, 5),
+    'GROUP_6_7': (6, 7),
+    'GROUP_8_9': (8, 9),
+}
+
+
+async def backfill_legacy_groups(db) -> int:
+    """Bo'sh floors.group_id larni eski GROUP_x_y o'zgaruvchilaridan to'ldirish"""
+    if tenant().id != tenants.DEFAULT_TENANT:
+        return 0
+    rows = [
+        (group_id, floor)
+        for name, floors in LEGACY_GROUP_ENV.items()
+        if (group_id := os.getenv(name))
+        for floor in floors
+    ]
+    if not rows:
+        return 0
+    cursor = await db.execute("SELECT id FROM floors WHERE group_id IS NULL OR group_id = ''")
+    empty = {row[0] for row in await cursor.fetchall()}
+    rows = [(group_id, floor) for group_id, floor in rows if floor in empty]
+    if rows:
+        await db.executemany("UPDATE floors SET group_id = ? WHERE id = ?", rows)
         await db.commit()
-        
-        # Agar xonalar yo'q bo'lsa, yaratamiz
-        cursor = await db.execute("SELECT COUNT(*) FROM rooms")
-        count = await cursor.fetchone()
-        if count[0] == 0:
-            await seed_data(db)
+        logger.info(f"🔗 {len(rows)} ta qavat guruhi .env (GROUP_x_y) dan ko'chirildi")
+    return len(rows)
+
+
+# Asosiy yotoqxona guruh IDlari (user tomonidan kiritilgan)
+DEFAULT_GROUP_IDS = {
+    2: '-1003863032013',  # 2-3 qavatlar
+    3: '-1003863032013',
+    4: '-5235799007',      # 4-5 qavatlar
+    5: '-5235799007',
+    6: '-5130425556',      # 6-7 qavatlar
+    7: '-5130425556',
+    8: '-5264518799',      # 8-9 qavatlar
+    9: '-5264518799',
+}
 
 
 async def seed_data(db):
     """Ma'lumotlarni boshlang'ich holatga keltirish"""
-    # Qavatlarni yaratish (2-9)
-    for floor_num in range(2, 10):
-        await db.execute(
-            "INSERT OR IGNORE INTO floors (id) VALUES (?)",
-            (floor_num,)
-        )
-    
-    # Xonalarni yaratish
-    for floor_num in range(2, 10):
-        for room_idx in range(1, 13):  # 1-12 xonalar
-            room_number = floor_num * 100 + room_idx
-            # Barcha xonalar 1 kun navbatchilik (12 kunlik davr)
-            duty_days = 1
-            await db.execute(
-                "INSERT OR IGNORE INTO rooms (number, floor, duty_days) VALUES (?, ?, ?)",
-                (room_number, floor_num, duty_days)
-            )
-    
+    # Standart bino: qavatlar, xonalar va glavni uborka xonalari
+    # Yangi yotoqxona guruhlari /setgroup yoki panel orqali ulanadi
+    group_ids = DEFAULT_GROUP_IDS if tenant().id == tenants.DEFAULT_TENANT else None
+    await topology.add_building(db, group_ids=group_ids, **topology.DEFAULT_BUILDING)
     await db.commit()
 
 
 # ========== CRUD Operations ==========
 
+# Bino/qavat/xona tuzilmasi (floors/rooms/buildings o'zgarganda qayta yuklanadi)
+async def get_topology() -> topology.Topology:
+    """Xotiradagi tuzilma - barcha qavat/xona sikllari shundan yuradi"""
+    state = tenant()
+    if state.topology is None:
+        async with connect(state.id) as db:
+            state.topology = await topology.load(db)
+    return state.topology
+
+
+async def add_building(name: str, floors: list, rooms_per_floor: int, general_cleaning=()) -> int:
+    """Yangi bino (qavatlar band bo'lsa - ValueError) va uning navbat jadvali"""
+    async with connect() as db:
+        building_id = await topology.add_building(db, name, floors, rooms_per_floor, general_cleaning)
+        await db.commit()
+    tenant().invalidate_floors()
+    await generate_schedule_horizon()
+    return building_id
+
+
+class DutyCache:
+    """Kunlik navbat jadvali uchun TTL kesh (sana bo'yicha)"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def get(self, day: str):
+        entry = self._entries.get(day)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def set(self, day: str, board: dict):
+        # Faqat bitta kun saqlanadi - eski sanalar tashlanadi
+        self._entries = {day: (time.monotonic(), board)}
+
+    def invalidate(self, day: str = None):
+        if day is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(day, None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+
+
+async def get_today_duties_by_floor() -> dict:
+    """Bugungi navbatchilar qavat bo'yicha: {qavat: navbat} (bitta so'rov)"""
+    today = date.today().isoformat()
+    duty_cache = tenant().duty_cache
+    board = duty_cache.get(today)
+    
+    if board is None:
+        async with connect() as db:
+            cursor = await db.execute(
+                "SELECT * FROM duty_schedule WHERE date = ? ORDER BY floor",
+                (today,)
+            )
+            rows = await cursor.fetchall()
+        
+        topo = await get_topology()
+        board = {}
+        for row in rows:
+            duty = dict(row)
+            duty['general_cleaning'] = topo.is_general_cleaning(duty['room_number'])
+            board[duty['floor']] = duty
+        duty_cache.set(today, board)
+    
+    # Keshdagi yozuvlarni chaqiruvchi o'zgartirib yubormasligi uchun nusxa
+    return {floor: dict(duty) for floor, duty in board.items()}
+
+
 async def get_today_duty(floor: int) -> dict:
     """Bugungi navbatchi xonani olish"""
-    today = date.today().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM duty_schedule WHERE date = ? AND floor = ?",
-            (today, floor)
-        )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+    board = await get_today_duties_by_floor()
+    return board.get(floor)
 
 
 async def get_all_today_duties() -> list:
     """Barcha qavatlarning bugungi navbatchilari"""
-    today = date.today().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    board = await get_today_duties_by_floor()
+    return list(board.values())
+
+
+async def generate_duty_schedule(day: date = None, days: int = 1) -> int:
+    """Navbat jadvalini yaratish (barcha qavatlar, bitta tranzaksiya)"""
+    day = day or date.today()
+    async with connect() as db:
+        inserted = await duty_engine.generate(db, day, days)
+    if inserted:
+        tenant().duty_cache.invalidate()
+    return inserted
+
+
+async def generate_schedule_horizon(days: int = None) -> int:
+    """Bugundan boshlab keyingi N kunlik jadvalni oldindan yaratish"""
+    return await generate_duty_schedule(date.today(), days or SCHEDULE_HORIZON_DAYS)
+
+
+async def get_floor_schedule(floor: int, days: int = None) -> list:
+    """Qavatning bugundan boshlab oldindan tuzilgan jadvali"""
+    start = date.today()
+    end = start + timedelta(days=(days or SCHEDULE_HORIZON_DAYS) - 1)
+    async with connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM duty_schedule WHERE date = ?",
-            (today,)
+            """SELECT * FROM duty_schedule
+               WHERE floor = ? AND date BETWEEN ? AND ?
+               ORDER BY date""",
+            (floor, start.isoformat(), end.isoformat())
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
@@ -172,7 +409,7 @@ async def confirm_duty(room_number: int, confirmed_by: str) -> bool:
     """Navbatchilikni tasdiqlash"""
     today = date.today().isoformat()
     now = datetime.now().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             """UPDATE duty_schedule 
                SET status = 'completed', confirmed_by = ?, confirmed_at = ?
@@ -180,13 +417,13 @@ async def confirm_duty(room_number: int, confirmed_by: str) -> bool:
             (confirmed_by, now, today, room_number)
         )
         await db.commit()
-        return True
+    tenant().duty_cache.invalidate(today)
+    return True
 
 
 async def get_floor_rooms(floor: int) -> list:
     """Qavatdagi barcha xonalar"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM rooms WHERE floor = ? ORDER BY number",
             (floor,)
@@ -198,8 +435,7 @@ async def get_floor_rooms(floor: int) -> list:
 async def get_pending_duties() -> list:
     """Bajarilmagan navbatchiliklar"""
     today = date.today().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM duty_schedule WHERE date = ? AND status = 'pending'",
             (today,)
@@ -212,30 +448,57 @@ async def add_penalty(room_number: int, penalty_type: str, reason: str,
                      days: int, issued_by: str):
     """Jazo qo'shish"""
     today = date.today()
-    end_date = date(today.year, today.month, today.day + days)
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    end_date = today + timedelta(days=days)
+    async with connect() as db:
         await db.execute(
             """INSERT INTO penalties (room_number, type, reason, start_date, end_date, issued_by)
                VALUES (?, ?, ?, ?, ?, ?)""",
             (room_number, penalty_type, reason, today.isoformat(), 
              end_date.isoformat(), issued_by)
         )
+        # Oldindan tuzilgan jadval jazoni hisobga olishi uchun
+        cursor = await db.execute("SELECT floor FROM rooms WHERE number = ?", (room_number,))
+        room = await cursor.fetchone()
+        if room:
+            await duty_engine.reset_future(db, room['floor'])
         await db.commit()
 
 
 async def set_floor_group(floor: int, group_id: str):
     """Qavat guruh IDsini o'rnatish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute(
+    await set_floors_group([floor], group_id)
+
+
+async def set_floors_group(floors: list, group_id: str):
+    """Bir nechta qavatni bitta guruhga ulash (bo'sh group_id - uzish)"""
+    async with connect() as db:
+        await db.executemany(
             "UPDATE floors SET group_id = ? WHERE id = ?",
-            (group_id, floor)
+            [(group_id or None, floor) for floor in floors]
         )
         await db.commit()
+    tenant().invalidate_floors()
+
+
+# Guruh -> qavatlar marshruti (floors jadvali o'zgarganda tashlanadi)
+async def get_group_routes(tenant_id: str = None) -> dict:
+    """{'groups': [{group_id, floors, label}], 'unassigned': [qavatlar]}"""
+    state = tenant(tenant_id)
+    if state.group_routes is None:
+        async with connect(state.id) as db:
+            state.group_routes = await routing.load(db)
+        if not state.group_routes['groups']:
+            # Aks holda /xabar va 21:00 xabarlari jimgina hech kimga yuborilmaydi
+            logger.warning(
+                f"⚠️ {state.name}: hech bir qavatga guruh ulanmagan "
+                "(guruhda /setgroup yoki admin panel orqali ulang)"
+            )
+    return state.group_routes
 
 
 async def set_floor_supervisor(floor: int, supervisor_id: str, name: str):
     """Qavat sardorini o'rnatish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             "UPDATE floors SET supervisor_id = ?, supervisor_name = ? WHERE id = ?",
             (supervisor_id, name, floor)
@@ -245,8 +508,7 @@ async def set_floor_supervisor(floor: int, supervisor_id: str, name: str):
 
 async def get_floor_info(floor: int) -> dict:
     """Qavat ma'lumotlari"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM floors WHERE id = ?",
             (floor,)
@@ -257,79 +519,112 @@ async def get_floor_info(floor: int) -> dict:
 
 # ========== Floor Supervisors (Sardorlar) ==========
 
+SUPERVISORS_WITH_FLOORS_SQL = """
+    SELECT s.*, GROUP_CONCAT(sf.floor) AS floor_csv
+    FROM floor_supervisors s
+    LEFT JOIN supervisor_floors sf ON sf.supervisor_id = s.id
+"""
+
+
+def _with_floor_list(row) -> dict:
+    """floor_csv ni floor_list: [2, 3] ga aylantirish"""
+    sup = dict(row)
+    csv = sup.pop('floor_csv', None)
+    sup['floor_list'] = sorted(int(f) for f in csv.split(',')) if csv else []
+    return sup
+
+
 async def add_floor_supervisor(telegram_id: str, name: str, floors: str):
     """Sardor qo'shish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute(
-            """INSERT OR REPLACE INTO floor_supervisors (telegram_id, name, floors)
-               VALUES (?, ?, ?)""",
-            (telegram_id, name, floors)
-        )
+    async with connect() as db:
+        await supervisors.save(db, telegram_id, name, floors)
         await db.commit()
+    invalidate_chat_index()
 
 
 async def get_all_floor_supervisors() -> list:
-    """Barcha sardorlar"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM floor_supervisors ORDER BY id")
+    """Barcha sardorlar (floor_list bilan)"""
+    async with connect() as db:
+        cursor = await db.execute(SUPERVISORS_WITH_FLOORS_SQL + " GROUP BY s.id ORDER BY s.id")
         rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return [_with_floor_list(row) for row in rows]
 
 
 async def get_floor_supervisor_by_telegram(telegram_id: str) -> dict:
-    """Telegram ID bo'yicha sardorni olish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Telegram ID bo'yicha sardorni olish (floor_list bilan)"""
+    async with connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM floor_supervisors WHERE telegram_id = ?",
+            SUPERVISORS_WITH_FLOORS_SQL + " WHERE s.telegram_id = ? GROUP BY s.id",
             (telegram_id,)
         )
         row = await cursor.fetchone()
+        return _with_floor_list(row) if row else None
+
+
+async def get_supervisor_floors(telegram_id: str) -> list:
+    """Foydalanuvchi mas'ul bo'lgan qavatlar"""
+    async with connect() as db:
+        cursor = await db.execute(supervisors.FLOORS_OF_SQL, (telegram_id,))
+        rows = await cursor.fetchall()
+        return [row[0] for row in rows]
+
+
+async def get_floor_owner(floor: int) -> dict:
+    """Qavat sardori"""
+    async with connect() as db:
+        cursor = await db.execute(supervisors.OWNER_OF_SQL, (floor,))
+        row = await cursor.fetchone()
         return dict(row) if row else None
 
 
 async def delete_floor_supervisor(supervisor_id: int):
     """Sardorni o'chirish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute("DELETE FROM floor_supervisors WHERE id = ?", (supervisor_id,))
+    async with connect() as db:
+        await supervisors.delete(db, supervisor_id)
         await db.commit()
+    invalidate_chat_index()
 
 
 # ========== Attendance (Davomat) ==========
 
+ATTENDANCE_UPSERT_SQL = """
+    INSERT INTO attendance (date, floor, student_count, notes, submitted_by, submitted_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (date, floor) DO UPDATE SET
+        student_count = excluded.student_count,
+        notes = excluded.notes,
+        submitted_by = excluded.submitted_by,
+        submitted_at = excluded.submitted_at
+"""
+
+
 async def save_attendance(floor: int, student_count: int, submitted_by: str, notes: str = None):
     """Davomatni saqlash"""
+    await save_attendance_bulk([(floor, student_count, notes)], submitted_by)
+
+
+async def save_attendance_bulk(entries: list, submitted_by: str):
+    """Bir nechta qavat davomati [(qavat, soni, izoh)] - bitta tranzaksiyada"""
     today = date.today().isoformat()
     now = datetime.now().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Avval mavjudini tekshirish
-        existing = await db.execute(
-            "SELECT id FROM attendance WHERE date = ? AND floor = ?",
-            (today, floor)
+    async with connect() as db:
+        await db.executemany(
+            ATTENDANCE_UPSERT_SQL,
+            [(today, floor, count, notes, submitted_by, now) for floor, count, notes in entries]
         )
-        if await existing.fetchone():
-            # Yangilash
-            await db.execute(
-                """UPDATE attendance SET student_count = ?, notes = ?, submitted_by = ?, submitted_at = ?
-                   WHERE date = ? AND floor = ?""",
-                (student_count, notes, submitted_by, now, today, floor)
-            )
-        else:
-            # Yangi qo'shish
-            await db.execute(
-                """INSERT INTO attendance (date, floor, student_count, notes, submitted_by, submitted_at)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (today, floor, student_count, notes, submitted_by, now)
-            )
         await db.commit()
 
 
+async def get_daily_summary(day: str = None) -> dict:
+    """Kunlik hisobot hisoblagichlari (daily_summary) - bitta so'rov"""
+    async with connect() as db:
+        return await summary.load(db, day or date.today().isoformat())
+
+
 async def get_today_attendance() -> list:
     """Bugungi davomat"""
     today = date.today().isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM attendance WHERE date = ? ORDER BY floor",
             (today,)
@@ -340,8 +635,7 @@ async def get_today_attendance() -> list:
 
 async def get_attendance_by_date(target_date: str) -> list:
     """Berilgan sanadagi davomat"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM attendance WHERE date = ? ORDER BY floor",
             (target_date,)
@@ -352,8 +646,7 @@ async def get_attendance_by_date(target_date: str) -> list:
 
 async def get_floor_attendance_for_date(floor: int, target_date: str) -> dict:
     """Ma'lum qavat uchun berilgan sanadagi davomat"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
             "SELECT * FROM attendance WHERE date = ? AND floor = ?",
             (target_date, floor)
@@ -362,25 +655,52 @@ async def get_floor_attendance_for_date(floor: int, target_date: str) -> dict:
         return dict(row) if row else None
 
 
+async def get_missing_attendance(target_date: str) -> list:
+    """Berilgan sanada davomat kiritilmagan qavatlari bor sardorlar (bitta so'rov)"""
+    async with connect() as db:
+        cursor = await db.execute(
+            """SELECT s.id, s.telegram_id, s.name,
+                      GROUP_CONCAT(sf.floor) AS floor_csv
+               FROM supervisor_floors sf
+               JOIN floor_supervisors s ON s.id = sf.supervisor_id
+               LEFT JOIN attendance a ON a.date = ? AND a.floor = sf.floor
+               WHERE a.id IS NULL
+               GROUP BY s.id
+               ORDER BY s.id""",
+            (target_date,)
+        )
+        rows = await cursor.fetchall()
+    
+    result = []
+    for row in rows:
+        sup = _with_floor_list(row)
+        sup['missing_floors'] = sup.pop('floor_list')
+        result.append(sup)
+    return result
+
+
 # ========== Duty Queue (Skip) ==========
 
 async def skip_duty_room(floor: int, room_number: int, reason: str, skipped_by: str):
     """Xonani o'tkazish va navbatga qo'shish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             """INSERT INTO duty_queue (floor, room_number, reason, skipped_by)
                VALUES (?, ?, ?, ?)""",
             (floor, room_number, reason, skipped_by)
         )
+        # Ertangi navbat shu xonaga o'tishi uchun jadvalni qayta hisoblaymiz
+        await duty_engine.reset_future(db, floor)
         await db.commit()
 
 
 async def get_queued_room(floor: int) -> dict:
     """Navbatdagi birinchi xonani olish (FIFO)"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM duty_queue WHERE floor = ? ORDER BY id LIMIT 1",
+            """SELECT * FROM duty_queue
+               WHERE floor = ? AND scheduled_date IS NULL
+               ORDER BY id LIMIT 1""",
             (floor,)
         )
         row = await cursor.fetchone()
@@ -389,7 +709,7 @@ async def get_queued_room(floor: int) -> dict:
 
 async def clear_duty_queue(floor: int, room_number: int):
     """Xonani navbatdan o'chirish (bajarilgandan keyin)"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             "DELETE FROM duty_queue WHERE floor = ? AND room_number = ? ORDER BY id LIMIT 1",
             (floor, room_number)
@@ -399,25 +719,15 @@ async def clear_duty_queue(floor: int, room_number: int):
 
 async def get_all_queued_rooms() -> list:
     """Barcha navbatdagi xonalar"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM duty_queue ORDER BY floor, id")
+    async with connect() as db:
+        cursor = await db.execute(
+            "SELECT * FROM duty_queue WHERE scheduled_date IS NULL ORDER BY floor, id"
+        )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
 
 async def get_next_room_in_sequence(floor: int, current_room: int) -> int:
     """Keyingi xona raqamini olish"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "SELECT number FROM rooms WHERE floor = ? ORDER BY number",
-            (floor,)
-        )
-        rooms = await cursor.fetchall()
-        room_numbers = [r[0] for r in rooms]
-        
-        if current_room in room_numbers:
-            idx = room_numbers.index(current_room)
-            next_idx = (idx + 1) % len(room_numbers)
-            return room_numbers[next_idx]
-        return room_numbers[0] if room_numbers else None
+    topo = await get_topology()
+    return topo.next_room(floor, current_room)
@@ -0,0 +1,157 @@
+"""
+Duty schedule engine for Talaba Bot
+Single roster generator shared by bot and admin panel
+"""
+
+from collections import deque
+from datetime import date, timedelta
+
+ROOMS_SQL = "SELECT number, floor, duty_days FROM rooms ORDER BY floor, number"
+
+EXISTING_SQL = "SELECT date, floor FROM duty_schedule WHERE date BETWEEN ? AND ?"
+
+# Hali kunga biriktirilmagan skip qilingan xonalar (FIFO)
+QUEUE_SQL = """
+    SELECT id, floor, room_number FROM duty_queue
+    WHERE scheduled_date IS NULL
+    ORDER BY floor, id
+"""
+
+# Oraliqqa tushadigan jazolar (start_date <= kun < end_date)
+PENALTIES_SQL = """
+    SELECT room_number, start_date, end_date FROM penalties
+    WHERE end_date > ? AND start_date <= ?
+    ORDER BY id
+"""
+
+INSERT_SQL = """
+    INSERT INTO duty_schedule (date, room_number, floor, status)
+    VALUES (?, ?, ?, 'pending')
+    ON CONFLICT (date, floor) DO NOTHING
+"""
+
+MARK_QUEUED_SQL = "UPDATE duty_queue SET scheduled_date = ? WHERE id = ?"
+
+# Kuni o'tgan queue yozuvlari kerak emas
+PURGE_QUEUE_SQL = "DELETE FROM duty_queue WHERE scheduled_date <= ?"
+
+# Skip/jazodan keyin qavatning kelajakdagi jadvalini qayta hisoblash uchun
+RESET_FUTURE_SQL = (
+    "DELETE FROM duty_schedule WHERE floor = ? AND date > ? AND status = 'pending'",
+    "UPDATE duty_queue SET scheduled_date = NULL WHERE floor = ? AND scheduled_date > ?",
+)
+
+
+def build_sequences(rooms) -> dict:
+    """Qavat bo'yicha navbat ketma-ketligi (duty_days marta takrorlanadi)"""
+    sequences = {}
+    for number, floor, duty_days in rooms:
+        sequences.setdefault(floor, []).extend([number] * (duty_days or 1))
+    return sequences
+
+
+def rotation_room(sequence: list, floor: int, day: date) -> int:
+    """Kun va qavat bo'yicha navbatchi xona (davr = ketma-ketlik uzunligi)"""
+    day_of_year = day.timetuple().tm_yday
+    # Har qavat uchun offset - shunda har qavatda har xil xona
+    floor_offset = (floor - 2) * 3  # 2-qavat: 0, 3-qavat: 3, 4-qavat: 6...
+    return sequence[(day_of_year + floor_offset) % len(sequence)]
+
+
+def penalty_room(penalties: list, day: str):
+    """Shu kuni jazo bo'yicha navbatchi xona (birinchi berilgan jazo)"""
+    for room_number, start_date, end_date in penalties:
+        if start_date <= day < end_date:
+            return room_number
+    return None
+
+
+def plan(sequences: dict, existing: set, queue: dict, penalties: dict,
+         start: date, days: int):
+    """Jadval rejasi: (qo'shiladigan qatorlar, [(kun, queue id)])"""
+    rows = []
+    used_queue = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        day_iso = day.isoformat()
+        for floor, sequence in sorted(sequences.items()):
+            if (day_iso, floor) in existing or not sequence:
+                continue
+
+            # 1. Avval queue'dagi xonalar (skip qilinganlar)
+            if queue.get(floor):
+                queue_id, duty_room = queue[floor].popleft()
+                used_queue.append((day_iso, queue_id))
+            else:
+                # 2. Jazolangan xona, 3. Normal hisoblash (offset bilan)
+                duty_room = penalty_room(penalties.get(floor, []), day_iso)
+                if duty_room is None:
+                    duty_room = rotation_room(sequence, floor, day)
+
+            rows.append((day_iso, duty_room, floor))
+    return rows, used_queue
+
+
+def _window(start: date, days: int):
+    return start.isoformat(), (start + timedelta(days=days - 1)).isoformat()
+
+
+def _prepare(rooms, existing_rows, queue_rows, penalty_rows, start, days):
+    sequences = build_sequences(rooms)
+    room_floor = {number: floor for number, floor, _ in rooms}
+
+    existing = {(d, floor) for d, floor in existing_rows}
+
+    queue = {}
+    for queue_id, floor, room_number in queue_rows:
+        queue.setdefault(floor, deque()).append((queue_id, room_number))
+
+    penalties = {}
+    for room_number, start_date, end_date in penalty_rows:
+        floor = room_floor.get(room_number)
+        if floor is not None:
+            penalties.setdefault(floor, []).append((room_number, start_date, end_date))
+
+    return plan(sequences, existing, queue, penalties, start, days)
+
+
+async def _plan(conn, start: date, days: int):
+    first, last = _window(start, days)
+    cursor = await conn.execute(ROOMS_SQL)
+    rooms = await cursor.fetchall()
+    cursor = await conn.execute(EXISTING_SQL, (first, last))
+    existing_rows = await cursor.fetchall()
+    cursor = await conn.execute(QUEUE_SQL)
+    queue_rows = await cursor.fetchall()
+    cursor = await conn.execute(PENALTIES_SQL, (first, last))
+    penalty_rows = await cursor.fetchall()
+    return _prepare(rooms, existing_rows, queue_rows, penalty_rows, start, days)
+
+
+async def generate(conn, start: date = None, days: int = 1) -> int:
+    """Jadvalni yaratish - qo'shilgan qatorlar soni"""
+    start = start or date.today()
+
+    # Jadval allaqachon to'liq bo'lsa, yozish qulfini olmaymiz
+    rows, _ = await _plan(conn, start, days)
+    if not rows:
+        return 0
+
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows, used_queue = await _plan(conn, start, days)
+        await conn.executemany(INSERT_SQL, rows)
+        await conn.executemany(MARK_QUEUED_SQL, used_queue)
+        await conn.execute(PURGE_QUEUE_SQL, (date.today().isoformat(),))
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return len(rows)
+
+
+async def reset_future(conn, floor: int):
+    """Qavatning ertangi va keyingi (bajarilmagan) navbatlarini bekor qilish"""
+    today = date.today().isoformat()
+    for sql in RESET_FUTURE_SQL:
+        await conn.execute(sql, (floor, today))
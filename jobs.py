@@ -0,0 +1,203 @@
+"""
+Background job queue for Talaba Bot admin panel
+SQLite-backed jobs table drained by an asyncio worker
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# Ishlayotgan worker shuncha soniyada bir heartbeat_at ni yangilaydi
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '15'))
+# Shuncha vaqt heartbeat bo'lmagan 'running' ish o'lgan jarayonniki hisoblanadi
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '60'))
+# Jarayonni qayta-qayta yiqitadigan ish cheksiz aylanmasligi uchun
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _decode(row) -> dict:
+    job = dict(row)
+    for key in ('payload', 'result'):
+        if job.get(key):
+            job[key] = json.loads(job[key])
+    return job
+
+
+async def enqueue(conn, kind: str, payload: dict = None) -> int:
+    """Ishni navbatga qo'yish - job id qaytaradi"""
+    cursor = await conn.execute(
+        "INSERT INTO jobs (kind, payload, status, created_at) VALUES (?, ?, ?, ?)",
+        (kind, json.dumps(payload or {}), QUEUED, _now())
+    )
+    await conn.commit()
+    return cursor.lastrowid
+
+
+async def get_job(conn, job_id: int) -> dict:
+    """Ish holati"""
+    cursor = await conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    row = await cursor.fetchone()
+    return _decode(row) if row else None
+
+
+async def claim_next(conn, worker: str = None) -> dict:
+    """Navbatdagi birinchi ishni olish (boshqa workerlar bilan to'qnashmasdan)"""
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+        )
+        row = await cursor.fetchone()
+        if row is None:
+            await conn.rollback()
+            return None
+        now = _now()
+        await conn.execute(
+            """UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, worker = ?,
+                              attempts = attempts + 1
+               WHERE id = ?""",
+            (RUNNING, now, now, worker, row['id'])
+        )
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return _decode(row)
+
+
+async def finish(conn, job_id: int, result: dict = None, error: str = None):
+    """Ishni yakunlash"""
+    await conn.execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+        (FAILED if error else DONE, json.dumps(result) if result is not None else None,
+         error, _now(), job_id)
+    )
+    await conn.commit()
+
+
+async def heartbeat(conn, job_id: int):
+    """Ish hali bajarilmoqda - requeue_stale uni qaytarmasin"""
+    await conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (_now(), job_id))
+    await conn.commit()
+
+
+async def requeue_stale(conn) -> tuple:
+    """Egasi o'lgan (heartbeat to'xtagan) ishlarni qaytarish: (qayta navbatga, xato deb yopilgan)"""
+    cutoff = (datetime.now() - timedelta(seconds=JOB_STALE_SECONDS)).isoformat()
+    stale = "status = ? AND COALESCE(heartbeat_at, started_at) < ?"
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await conn.execute(
+            f"""UPDATE jobs SET status = ?, error = ?, finished_at = ?
+                WHERE {stale} AND attempts >= ?""",
+            (FAILED, f"{JOB_MAX_ATTEMPTS} marta urinildi, jarayon uzilib qoldi", _now(),
+             RUNNING, cutoff, JOB_MAX_ATTEMPTS)
+        )
+        failed = cursor.rowcount
+        cursor = await conn.execute(
+            f"UPDATE jobs SET status = ?, worker = NULL WHERE {stale}",
+            (QUEUED, RUNNING, cutoff)
+        )
+        requeued = cursor.rowcount
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return requeued, failed
+
+
+class JobWorker:
+    """Navbatdagi ishlarni fonda bajaruvchi asyncio vazifa"""
+
+    def __init__(self, connect, handlers: dict, poll_interval: float = None):
+        # connect() - async context manager (database.connect kabi)
+        self.connect = connect
+        self.handlers = handlers
+        self.poll_interval = poll_interval or JOB_POLL_INTERVAL
+        # Ish egasi - qaysi jarayon olganini ko'rish uchun
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._next_requeue = 0.0
+        self._wake = asyncio.Event()
+        self._stopped = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run(), name='job-worker')
+
+    def notify(self):
+        """Yangi ish qo'shilganini bildirish (kutmasdan uyg'otadi)"""
+        self._wake.set()
+
+    async def stop(self):
+        """Joriy ish tugagach to'xtash"""
+        self._stopped = True
+        self._wake.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _requeue_stale(self):
+        """Davriy: to'xtagan jarayonlar ishlarini qaytarish (faqat ishga tushishda emas)"""
+        if time.monotonic() < self._next_requeue:
+            return
+        self._next_requeue = time.monotonic() + JOB_HEARTBEAT_SECONDS
+        async with self.connect() as conn:
+            requeued, failed = await requeue_stale(conn)
+        if requeued:
+            logger.info(f"{requeued} ta uzilgan ish qayta navbatga qo'yildi")
+        if failed:
+            logger.warning(f"{failed} ta ish {JOB_MAX_ATTEMPTS} urinishdan keyin to'xtatildi")
+
+    async def run(self):
+        while not self._stopped:
+            await self._requeue_stale()
+            async with self.connect() as conn:
+                job = await claim_next(conn, self.worker_id)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            await self._run_job(job)
+
+    async def _beat(self, job_id: int):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            async with self.connect() as conn:
+                await heartbeat(conn, job_id)
+
+    async def _run_job(self, job: dict):
+        handler = self.handlers.get(job['kind'])
+        result, error = None, None
+        if handler is None:
+            error = f"Noma'lum ish turi: {job['kind']}"
+        else:
+            beat = asyncio.create_task(self._beat(job['id']))
+            try:
+                result = await handler(job['payload'])
+            except Exception as e:
+                logger.exception(f"Ish #{job['id']} xato bilan tugadi")
+                error = str(e)
+            finally:
+                beat.cancel()
+        async with self.connect() as conn:
+            await finish(conn, job['id'], result=result, error=error)
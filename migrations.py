@@ -0,0 +1,414 @@
+"""
+Schema migrations for Talaba Bot
+Versioned changes tracked in the schema_version table, shared by bot and admin panel
+"""
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+CURRENT_VERSION_SQL = "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+
+RECORD_VERSION_SQL = "INSERT OR IGNORE INTO schema_version (version, description) VALUES (?, ?)"
+
+# Sxema shu versiyada ekanligi fayl sarlavhasida (jadvallarni o'qimasdan tekshiriladi)
+USER_VERSION_SQL = "PRAGMA user_version"
+
+# Asosiy jadvallar - bot va admin panel uchun yagona manba (migratsiyalardan oldingi holat)
+BASE_SCHEMA = [
+    # Qavatlar jadvali
+    """CREATE TABLE IF NOT EXISTS floors (
+           id INTEGER PRIMARY KEY,
+           group_id TEXT,
+           supervisor_id TEXT,
+           supervisor_name TEXT
+       )""",
+    # Xonalar jadvali
+    """CREATE TABLE IF NOT EXISTS rooms (
+           number INTEGER PRIMARY KEY,
+           floor INTEGER,
+           duty_days INTEGER DEFAULT 1,
+           FOREIGN KEY (floor) REFERENCES floors(id)
+       )""",
+    # Navbat jadvali
+    """CREATE TABLE IF NOT EXISTS duty_schedule (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           date TEXT,
+           room_number INTEGER,
+           floor INTEGER,
+           status TEXT DEFAULT 'pending',
+           confirmed_by TEXT,
+           confirmed_at TEXT,
+           FOREIGN KEY (room_number) REFERENCES rooms(number)
+       )""",
+    # Jazolar jadvali
+    """CREATE TABLE IF NOT EXISTS penalties (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           room_number INTEGER,
+           type TEXT,
+           reason TEXT,
+           start_date TEXT,
+           end_date TEXT,
+           issued_by TEXT,
+           created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+           FOREIGN KEY (room_number) REFERENCES rooms(number)
+       )""",
+    # Talabalar ro'yxati (ixtiyoriy)
+    """CREATE TABLE IF NOT EXISTS students (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           telegram_id TEXT,
+           name TEXT,
+           room_number INTEGER,
+           FOREIGN KEY (room_number) REFERENCES rooms(number)
+       )""",
+    # Qavat sardorlari (davomat uchun)
+    """CREATE TABLE IF NOT EXISTS floor_supervisors (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           telegram_id TEXT UNIQUE,
+           name TEXT,
+           floors TEXT
+       )""",
+    # Davomat jadvali
+    """CREATE TABLE IF NOT EXISTS attendance (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           date TEXT,
+           floor INTEGER,
+           student_count INTEGER,
+           notes TEXT,
+           submitted_by TEXT,
+           submitted_at TEXT
+       )""",
+    # Navbat navbati (skip qilingan xonalar)
+    """CREATE TABLE IF NOT EXISTS duty_queue (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           floor INTEGER,
+           room_number INTEGER,
+           reason TEXT,
+           skipped_by TEXT,
+           created_at TEXT DEFAULT CURRENT_TIMESTAMP
+       )""",
+]
+
+# Eski admin panel yaratgan bazalarda bo'lmasligi mumkin bo'lgan ustunlar
+BASE_COLUMNS = {
+    'attendance': {'notes': 'TEXT'},
+}
+
+
+def _add_columns(table: str, existing: set) -> list:
+    """Yetishmagan ustunlar uchun ALTER TABLE buyruqlari"""
+    return [
+        f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"
+        for column, ddl in BASE_COLUMNS[table].items() if column not in existing
+    ]
+
+
+def _change_triggers(scopes: dict) -> list:
+    """Har bir jadval o'zgarishida change_versions dagi scope ni oshiruvchi triggerlar"""
+    statements = [
+        f"INSERT OR IGNORE INTO change_versions (scope, version) VALUES ('{scope}', 0)"
+        for scope in sorted(set(scopes.values()))
+    ]
+    for table, scope in scopes.items():
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(
+                f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE change_versions SET version = version + 1 WHERE scope = '{scope}';
+                    END"""
+            )
+    return statements
+
+
+# daily_summary dagi umumiy (barcha kunlar) qator kaliti
+SUMMARY_ALL = 'all'
+
+
+def _summary_upsert(day: str, **deltas) -> list:
+    """Trigger ichida: kun qatorini yaratib, hisoblagichlarni o'zgartirish"""
+    sets = ", ".join(f"{col} = {col} + ({delta})" for col, delta in deltas.items())
+    # INSERT OR IGNORE emas: UPSERT ning DO UPDATE qismidan chaqirilganda
+    # tashqi ON CONFLICT qoidasi ustun bo'lib, IGNORE xatoga aylanadi
+    return [
+        f"""INSERT INTO daily_summary (date) SELECT {day}
+            WHERE {day} IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM daily_summary WHERE date = {day});""",
+        f"UPDATE daily_summary SET {sets} WHERE date = {day};",
+    ]
+
+
+def _summary_triggers() -> list:
+    """duty_schedule, attendance va penalties o'zgarganda daily_summary ni yangilovchi triggerlar"""
+    # jadval: (sana ustuni, hisoblagichga ta'sir qiluvchi ustunlar, hisoblagichlar)
+    sources = {
+        'duty_schedule': ('date', 'date, status', lambda r: {
+            'duties': "1",
+            'completed': f"{r}.status = 'completed'",
+        }),
+        'attendance': ('date', 'date, student_count', lambda r: {
+            'attendance_floors': "1",
+            'students': f"COALESCE({r}.student_count, 0)",
+        }),
+        'penalties': ('start_date', 'start_date', lambda r: {
+            'penalties': "1",
+        }),
+    }
+    statements = []
+    for table, (date_col, columns, counters) in sources.items():
+        add = _summary_upsert(f"NEW.{date_col}", **counters('NEW'))
+        remove = _summary_upsert(
+            f"OLD.{date_col}", **{col: f"-({v})" for col, v in counters('OLD').items()}
+        )
+        total_add, total_remove = [], []
+        if table == 'penalties':
+            # Umumiy jazolar soni - 'all' qatorida
+            total_add = _summary_upsert(f"'{SUMMARY_ALL}'", penalties="1")
+            total_remove = _summary_upsert(f"'{SUMMARY_ALL}'", penalties="-1")
+        events = (('insert', 'INSERT', add + total_add), ('delete', 'DELETE', remove + total_remove),
+                  ('update', f'UPDATE OF {columns}', remove + add))
+        for name, event, body in events:
+            body = "\n                        ".join(body)
+            statements.append(
+                f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{name}_summary
+                    AFTER {event} ON {table}
+                    BEGIN
+                        {body}
+                    END"""
+            )
+    return statements
+
+
+# Mavjud ma'lumotlardan daily_summary ni bir marta to'ldirish
+SUMMARY_BACKFILL_SQL = f"""
+    INSERT OR REPLACE INTO daily_summary (date, duties, completed, attendance_floors, students, penalties)
+    SELECT day, SUM(duties), SUM(completed), SUM(floors), SUM(students), SUM(penalties) FROM (
+        SELECT date AS day, COUNT(*) AS duties, SUM(status = 'completed') AS completed,
+               0 AS floors, 0 AS students, 0 AS penalties
+        FROM duty_schedule GROUP BY date
+        UNION ALL
+        SELECT date, 0, 0, COUNT(*), COALESCE(SUM(student_count), 0), 0 FROM attendance GROUP BY date
+        UNION ALL
+        SELECT start_date, 0, 0, 0, 0, COUNT(*) FROM penalties GROUP BY start_date
+        UNION ALL
+        SELECT '{SUMMARY_ALL}', 0, 0, 0, 0, COUNT(*) FROM penalties
+    )
+    WHERE day IS NOT NULL
+    GROUP BY day
+"""
+
+# (versiya, tavsif, SQL buyruqlar) - faqat oxiriga qo'shiladi, eskilari o'zgartirilmaydi
+MIGRATIONS = [
+    (1, "duty/attendance indekslari", [
+        # Takroriy qatorlarni tozalash (UNIQUE indeksdan oldin)
+        """DELETE FROM duty_schedule WHERE id NOT IN (
+               SELECT MIN(id) FROM duty_schedule GROUP BY date, floor)""",
+        """DELETE FROM attendance WHERE id NOT IN (
+               SELECT MAX(id) FROM attendance GROUP BY date, floor)""",
+
+        # Navbat jadvali
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_duty_schedule_date_floor ON duty_schedule (date, floor)",
+        "CREATE INDEX IF NOT EXISTS ix_duty_schedule_date_status ON duty_schedule (date, status)",
+        "CREATE INDEX IF NOT EXISTS ix_duty_schedule_date_room ON duty_schedule (date, room_number)",
+
+        # Davomat
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_attendance_date_floor ON attendance (date, floor)",
+
+        # Skip navbati (FIFO: floor + id)
+        "CREATE INDEX IF NOT EXISTS ix_duty_queue_floor_id ON duty_queue (floor, id)",
+        "CREATE INDEX IF NOT EXISTS ix_duty_queue_floor_room ON duty_queue (floor, room_number)",
+
+        # Jazolar
+        "CREATE INDEX IF NOT EXISTS ix_penalties_room ON penalties (room_number, start_date)",
+        "CREATE INDEX IF NOT EXISTS ix_penalties_created_at ON penalties (created_at)",
+
+        # Xonalar qavat bo'yicha
+        "CREATE INDEX IF NOT EXISTS ix_rooms_floor_number ON rooms (floor, number)",
+    ]),
+    (2, "duty_queue.scheduled_date (oldindan tuzilgan jadval uchun)", [
+        "ALTER TABLE duty_queue ADD COLUMN scheduled_date TEXT",
+        "CREATE INDEX IF NOT EXISTS ix_duty_queue_scheduled ON duty_queue (floor, scheduled_date)",
+        "CREATE INDEX IF NOT EXISTS ix_duty_schedule_floor_date ON duty_schedule (floor, date)",
+        "CREATE INDEX IF NOT EXISTS ix_penalties_end_date ON penalties (end_date)",
+    ]),
+    (3, "admin panel fon ishlari navbati", [
+        """CREATE TABLE IF NOT EXISTS jobs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               kind TEXT NOT NULL,
+               payload TEXT,
+               status TEXT NOT NULL DEFAULT 'queued',
+               result TEXT,
+               error TEXT,
+               attempts INTEGER NOT NULL DEFAULT 0,
+               created_at TEXT,
+               started_at TEXT,
+               finished_at TEXT
+           )""",
+        "CREATE INDEX IF NOT EXISTS ix_jobs_status_id ON jobs (status, id)",
+    ]),
+    (4, "supervisor_floors (sardor <-> qavat) jadvali", [
+        """CREATE TABLE IF NOT EXISTS supervisor_floors (
+               supervisor_id INTEGER NOT NULL REFERENCES floor_supervisors(id),
+               floor INTEGER NOT NULL,
+               PRIMARY KEY (supervisor_id, floor)
+           )""",
+        "CREATE INDEX IF NOT EXISTS ix_supervisor_floors_floor ON supervisor_floors (floor, supervisor_id)",
+        # Eski floors ('2,3') ustunidan ko'chirish
+        """WITH RECURSIVE split(supervisor_id, floor, rest) AS (
+               SELECT id, '', COALESCE(floors, '') || ',' FROM floor_supervisors
+               UNION ALL
+               SELECT supervisor_id,
+                      TRIM(substr(rest, 1, instr(rest, ',') - 1)),
+                      substr(rest, instr(rest, ',') + 1)
+               FROM split WHERE rest <> ''
+           )
+           INSERT OR IGNORE INTO supervisor_floors (supervisor_id, floor)
+           SELECT supervisor_id, CAST(floor AS INTEGER) FROM split
+           WHERE floor <> '' AND floor NOT GLOB '*[^0-9]*'""",
+    ]),
+    (5, "change_versions (jarayonlararo kesh versiyalari)", [
+        """CREATE TABLE IF NOT EXISTS change_versions (
+               scope TEXT PRIMARY KEY,
+               version INTEGER NOT NULL DEFAULT 0
+           )""",
+        "INSERT OR IGNORE INTO change_versions (scope, version) VALUES ('supervisors', 0)",
+    ]),
+    (6, "o'zgarishlar lentasi triggerlari", _change_triggers({
+        'floor_supervisors': 'supervisors',
+        'supervisor_floors': 'supervisors',
+        'floors': 'floors',
+        'rooms': 'floors',
+        'duty_schedule': 'duty',
+        'penalties': 'duty',
+        'duty_queue': 'duty',
+        'attendance': 'attendance',
+    })),
+    (7, "bino topologiyasi (buildings, floors.building_id, rooms.general_cleaning)", [
+        """CREATE TABLE IF NOT EXISTS buildings (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               name TEXT NOT NULL
+           )""",
+        "ALTER TABLE floors ADD COLUMN building_id INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE rooms ADD COLUMN general_cleaning INTEGER NOT NULL DEFAULT 0",
+        # Mavjud bazalar: bitta bino va eski 1, 6, 7, 12 qoidasi
+        "INSERT INTO buildings (id, name) SELECT 1, 'Asosiy bino' WHERE EXISTS (SELECT 1 FROM floors)",
+        "UPDATE rooms SET general_cleaning = 1 WHERE number % 100 IN (1, 6, 7, 12)",
+        "CREATE INDEX IF NOT EXISTS ix_floors_building ON floors (building_id, id)",
+    ] + _change_triggers({'buildings': 'floors'})),
+    (8, "daily_summary (kunlik hisobot hisoblagichlari)", [
+        """CREATE TABLE IF NOT EXISTS daily_summary (
+               date TEXT PRIMARY KEY,
+               duties INTEGER NOT NULL DEFAULT 0,
+               completed INTEGER NOT NULL DEFAULT 0,
+               attendance_floors INTEGER NOT NULL DEFAULT 0,
+               students INTEGER NOT NULL DEFAULT 0,
+               penalties INTEGER NOT NULL DEFAULT 0
+           )""",
+        SUMMARY_BACKFILL_SQL,
+    ] + _summary_triggers()),
+    (9, "jobs.worker va heartbeat_at (uzilgan ishlarni qaytarish uchun)", [
+        "ALTER TABLE jobs ADD COLUMN worker TEXT",
+        "ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT",
+    ]),
+    (10, "supervisor_floors: eski '2-3' oraliqlarini ko'chirish", [
+        # 4-migratsiya faqat '2,3' ni ko'chirgan - oraliqlar parse_floors kabi yoyiladi
+        """WITH RECURSIVE split(supervisor_id, part, rest) AS (
+               SELECT id, '', COALESCE(floors, '') || ',' FROM floor_supervisors
+               UNION ALL
+               SELECT supervisor_id,
+                      TRIM(substr(rest, 1, instr(rest, ',') - 1)),
+                      substr(rest, instr(rest, ',') + 1)
+               FROM split WHERE rest <> ''
+           ),
+           bounds(supervisor_id, first, last) AS (
+               SELECT supervisor_id,
+                      TRIM(substr(part, 1, instr(part, '-') - 1)),
+                      TRIM(substr(part, instr(part, '-') + 1))
+               FROM split WHERE instr(part, '-') > 0
+           ),
+           spans(supervisor_id, floor, last) AS (
+               SELECT supervisor_id, CAST(first AS INTEGER), CAST(last AS INTEGER) FROM bounds
+               WHERE first <> '' AND first NOT GLOB '*[^0-9]*'
+                 AND last <> '' AND last NOT GLOB '*[^0-9]*'
+                 -- Buzuq yozuv ('2-99999') cheksiz qator yaratmasin
+                 AND CAST(last AS INTEGER) - CAST(first AS INTEGER) BETWEEN 0 AND 100
+               UNION ALL
+               SELECT supervisor_id, floor + 1, last FROM spans WHERE floor < last
+           )
+           INSERT OR IGNORE INTO supervisor_floors (supervisor_id, floor)
+           SELECT supervisor_id, floor FROM spans""",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def _pending(current: int) -> list:
+    """Hali qo'llanilmagan migratsiyalar"""
+    return [m for m in MIGRATIONS if m[0] > current]
+
+
+async def migrate(db) -> int:
+    """Migratsiyalarni qo'llash (bot va admin panel)"""
+    await db.execute(SCHEMA_VERSION_DDL)
+    await db.commit()
+
+    cursor = await db.execute(CURRENT_VERSION_SQL)
+    current = (await cursor.fetchone())[0]
+    if not _pending(current):
+        return current
+
+    # Ikkinchi jarayon bilan bir vaqtda ishlamasligi uchun yozish qulfi
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await db.execute(CURRENT_VERSION_SQL)
+        current = (await cursor.fetchone())[0]
+        for version, description, statements in _pending(current):
+            for sql in statements:
+                await db.execute(sql)
+            await db.execute(RECORD_VERSION_SQL, (version, description))
+            current = version
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return current
+
+
+async def is_current(db) -> bool:
+    """Tez tekshiruv: baza allaqachon LATEST_VERSION da yoki yangiroq (DDL va so'rovlarsiz)"""
+    cursor = await db.execute(USER_VERSION_SQL)
+    # Yangiroq versiya - rolling deploy da eski build ham sekin yo'lga tushmasin
+    return (await cursor.fetchone())[0] >= LATEST_VERSION
+
+
+async def ensure(db) -> int:
+    """Asosiy jadvallar, yetishmagan ustunlar va migratsiyalar (sekin yo'l)"""
+    # Ustunlar qulf ostida tekshiriladi - ikki jarayon bir ustunni ikki marta qo'shmasin
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        for sql in BASE_SCHEMA:
+            await db.execute(sql)
+        for table in BASE_COLUMNS:
+            cursor = await db.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in await cursor.fetchall()}
+            for sql in _add_columns(table, existing):
+                await db.execute(sql)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return await migrate(db)
+
+
+async def mark_current(db):
+    """Keyingi ishga tushishlar DDL ni o'tkazib yuborishi uchun versiyani yozish (hech qachon pasaytirmaydi)"""
+    cursor = await db.execute(USER_VERSION_SQL)
+    if (await cursor.fetchone())[0] >= LATEST_VERSION:
+        return
+    await db.execute(f"PRAGMA user_version = {LATEST_VERSION}")
+    await db.commit()
@@ -0,0 +1,270 @@
+"""
+Outbound message scheduler for Talaba Bot
+Token-bucket rate limiting (global + per chat) with priority lanes
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram limiti bitta bot tokeniga - bot va admin panel jarayonlari uni bo'lishadi
+GLOBAL_RATE = float(os.getenv('OUTBOX_GLOBAL_RATE', '30'))          # xabar/soniya, jami
+PANEL_RATE = float(os.getenv('OUTBOX_PANEL_RATE', '5'))             # shundan admin panel ulushi
+BOT_RATE = max(1.0, GLOBAL_RATE - PANEL_RATE)
+GROUP_RATE_PER_MIN = float(os.getenv('OUTBOX_GROUP_RATE', '20'))    # xabar/daqiqa
+PRIVATE_RATE = 1.0                                                  # xabar/soniya
+
+# Ustuvorlik: kichik raqam - oldinroq
+ADMIN = 0
+NOTIFY = 1
+REMINDER = 2
+
+LANES = {ADMIN: 'admin', NOTIFY: 'notify', REMINDER: 'reminder'}
+
+
+class TokenBucket:
+    """Oddiy token bucket (rate - token/soniya)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Keyingi token uchun kutish vaqti (0 - hozir bor)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class _Outgoing:
+    __slots__ = ('bot', 'chat_id', 'kwargs', 'future', 'enqueued_at', 'priority')
+
+    def __init__(self, bot, chat_id, kwargs, future, priority):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.future = future
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class OutboundScheduler:
+    """bot.send_message ni Telegram limitlariga moslab navbat bilan yuborish"""
+
+    def __init__(self, global_rate: float = None, group_rate_per_min: float = None):
+        global_rate = global_rate or GLOBAL_RATE
+        self.group_rate = (group_rate_per_min or GROUP_RATE_PER_MIN) / 60
+        self.group_capacity = group_rate_per_min or GROUP_RATE_PER_MIN
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._queue = None
+        self._worker = None
+        self._seq = itertools.count()
+        self._deferred = 0
+        self._inflight = set()
+        self._slots = None
+        self._paused_until = 0.0
+        self._stats = {lane: {"sent": 0, "failed": 0, "wait_total": 0.0, "wait_max": 0.0}
+                       for lane in LANES.values()}
+        self.max_depth = 0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self, max_inflight: int = None, global_rate: float = None):
+        """Worker ni ishga tushirish (post_init da), max_inflight - HTTP havza hajmi,
+        global_rate - shu jarayonning umumiy limitdagi ulushi"""
+        if self.running:
+            return
+        if global_rate:
+            self._global = TokenBucket(global_rate, global_rate)
+        self._slots = asyncio.Semaphore(max_inflight) if max_inflight else None
+        self._queue = asyncio.PriorityQueue()
+        self._worker = asyncio.create_task(self._run(), name='outbox')
+
+    async def stop(self):
+        """Worker ni to'xtatish (post_shutdown da)"""
+        if not self.running:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        # Yuborilmay qolganlarni kutayotganlar osilib qolmasin
+        while not self._queue.empty():
+            _, _, item = self._queue.get_nowait()
+            self._fail(item, RuntimeError("Outbox to'xtatildi"))
+        logger.info(f"📤 Outbox statistikasi: {self.stats()}")
+
+    async def send_message(self, bot, chat_id, text: str, priority: int = NOTIFY, **kwargs):
+        """Navbat orqali xabar yuborish - yuborilgan Message qaytadi"""
+        if not self.running:
+            return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+
+        kwargs['text'] = text
+        future = asyncio.get_running_loop().create_future()
+        self._put(priority, _Outgoing(bot, chat_id, kwargs, future, priority))
+        return await future
+
+    def depth(self) -> int:
+        """Navbatdagi (kechiktirilganlar bilan) xabarlar soni"""
+        return (self._queue.qsize() if self._queue else 0) + self._deferred
+
+    def stats(self) -> dict:
+        lanes = {}
+        for lane, s in self._stats.items():
+            done = s['sent'] + s['failed']
+            lanes[lane] = {
+                "sent": s['sent'],
+                "failed": s['failed'],
+                "avg_wait": round(s['wait_total'] / done, 3) if done else 0.0,
+                "max_wait": round(s['wait_max'], 3),
+            }
+        return {"depth": self.depth(), "max_depth": self.max_depth, "lanes": lanes}
+
+    # ---------- ichki ----------
+
+    def _put(self, priority, item):
+        self._queue.put_nowait((priority, next(self._seq), item))
+        self.max_depth = max(self.max_depth, self.depth())
+
+    def _requeue_later(self, delay, priority, item):
+        self._deferred += 1
+
+        def _back():
+            self._deferred -= 1
+            if self.running:
+                self._put(priority, item)
+            else:
+                self._fail(item, RuntimeError("Outbox to'xtatildi"))
+
+        asyncio.get_running_loop().call_later(delay, _back)
+
+    @staticmethod
+    def _fail(item, error):
+        if not item.future.done():
+            item.future.set_exception(error)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Guruh ID lari manfiy
+            if str(chat_id).startswith('-'):
+                bucket = TokenBucket(self.group_rate, self.group_capacity)
+            else:
+                bucket = TokenBucket(PRIVATE_RATE, PRIVATE_RATE)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _run(self):
+        while True:
+            priority, _, item = await self._queue.get()
+
+            # Shu chat limiti tugagan - boshqa chatlarni bloklamaslik uchun keyinga
+            chat_delay = self._chat_bucket(item.chat_id).delay()
+            if chat_delay > 0:
+                self._requeue_later(chat_delay, priority, item)
+                continue
+
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+            delay = self._global.delay()
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self._global.delay()
+
+            # Havzada bo'sh ulanish bo'lguncha keyingisini jo'natmaymiz,
+            # aks holda so'rovlar havzada kutib pool timeout bilan yiqiladi
+            slots = self._slots
+            if slots is not None:
+                await slots.acquire()
+
+            self._global.take()
+            self._chat_bucket(item.chat_id).take()
+            task = asyncio.create_task(self._deliver(item, slots))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, item, slots):
+        try:
+            await self._send(item)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    async def _send(self, item):
+        stats = self._stats[LANES.get(item.priority, 'notify')]
+        wait = time.monotonic() - item.enqueued_at
+        try:
+            message = await item.bot.send_message(chat_id=item.chat_id, **item.kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, 'total_seconds'):
+                retry_after = retry_after.total_seconds()
+            # Telegram flood limit - butun navbatni to'xtatib, qayta urinamiz
+            self._paused_until = time.monotonic() + retry_after
+            self._requeue_later(retry_after, item.priority, item)
+            return
+        except Exception as e:
+            stats['failed'] += 1
+            self._fail(item, e)
+        else:
+            stats['sent'] += 1
+            if not item.future.done():
+                item.future.set_result(message)
+
+        stats['wait_total'] += wait
+        stats['wait_max'] = max(stats['wait_max'], wait)
+
+
+_outbox = OutboundScheduler()
+
+
+def start(max_inflight: int = None, global_rate: float = None):
+    _outbox.start(max_inflight, global_rate)
+
+
+async def stop():
+    await _outbox.stop()
+
+
+def stats() -> dict:
+    return _outbox.stats()
+
+
+async def send_message(bot, chat_id, text: str, priority: int = NOTIFY, **kwargs):
+    """Umumiy outbox orqali xabar yuborish"""
+    return await _outbox.send_message(bot, chat_id, text, priority, **kwargs)
+
+
+async def send_many(bot, messages: list, priority: int = NOTIFY, **kwargs) -> list:
+    """[(chat_id, text) yoki (chat_id, text, {qo'shimcha})] - natija yoki xato, shu tartibda"""
+    sends = []
+    for chat_id, text, *extra in messages:
+        options = dict(kwargs, **(extra[0] if extra else {}))
+        sends.append(send_message(bot, chat_id, text, priority, **options))
+    return await asyncio.gather(*sends, return_exceptions=True)
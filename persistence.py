@@ -0,0 +1,189 @@
+"""
+SQLite persistence for Talaba Bot
+Conversation states and user/chat/bot data survive restarts; writes are batched
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+import aiosqlite
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_PATH = os.getenv('PERSISTENCE_PATH', 'bot_state.db')
+# PTB o'zgargan ma'lumotlarni shuncha soniyada bir marta yozadi (har update da emas)
+PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '10'))
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS bot_data (id INTEGER PRIMARY KEY CHECK (id = 1), data TEXT NOT NULL)",
+    """CREATE TABLE IF NOT EXISTS conversations (
+           name TEXT NOT NULL,
+           key TEXT NOT NULL,
+           state TEXT NOT NULL,
+           PRIMARY KEY (name, key)
+       )""",
+)
+
+# Har bir jadval uchun (yozish, o'chirish) SQL
+WRITE_SQL = {
+    'user_data': ("INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)",
+                  "DELETE FROM user_data WHERE user_id = ?"),
+    'chat_data': ("INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)",
+                  "DELETE FROM chat_data WHERE chat_id = ?"),
+    'bot_data': ("INSERT OR REPLACE INTO bot_data (id, data) VALUES (?, ?)",
+                 "DELETE FROM bot_data WHERE id = ?"),
+}
+
+# Hali yozilmagan kalit (None - o'chirilgan qatordan farqli)
+_MISSING = object()
+
+CONVERSATION_SQL = (
+    "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+    "DELETE FROM conversations WHERE name = ? AND key = ?",
+)
+
+
+class SQLitePersistence(BasePersistence):
+    """PTB persistence - bitta SQLite fayl, o'zgarishlar bitta tranzaksiyada yoziladi"""
+
+    def __init__(self, path: str = None, update_interval: float = None):
+        super().__init__(
+            store_data=PersistenceInput(callback_data=False),
+            update_interval=update_interval or PERSISTENCE_INTERVAL,
+        )
+        self.path = path or PERSISTENCE_PATH
+        self._conn = None
+        self._pending = {}
+        # Bazadagi oxirgi qiymat (JSON) - o'zgarmaganini qayta yozmaslik uchun
+        self._written = {}
+        self._writer = None
+        self.batches = 0
+        self.rows_written = 0
+
+    async def _db(self):
+        if self._conn is None:
+            conn = await aiosqlite.connect(self.path)
+            # WAL + NORMAL: har commit da fsync yo'q
+            await conn.execute("PRAGMA journal_mode = WAL")
+            await conn.execute("PRAGMA synchronous = NORMAL")
+            for sql in SCHEMA:
+                await conn.execute(sql)
+            await conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _rows(self, sql: str) -> list:
+        conn = await self._db()
+        cursor = await conn.execute(sql)
+        return await cursor.fetchall()
+
+    # ---------- yozish navbati ----------
+
+    def _stage(self, key: tuple, value):
+        """Yozuvni navbatga qo'yish - bir davrdagi barcha o'zgarishlar bitta commit"""
+        data = None if value is None else json.dumps(value, ensure_ascii=False)
+        # PTB bot_data va boshqalarni har update_interval da beradi - o'zgarmagan bo'lsa yozmaymiz
+        if data == self._pending.get(key, self._written.get(key, _MISSING)):
+            return
+        self._pending[key] = data
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self):
+        # PTB update_* larni gather bilan chaqiradi - hammasi navbatga tushishini kutamiz
+        await asyncio.sleep(0)
+        conn = await self._db()
+        # Yozish paytida kelganlar - keyingi aylanishda
+        while self._pending:
+            pending, self._pending = self._pending, {}
+            for (table, *ids), value in pending.items():
+                if table == 'conversations':
+                    write_sql, delete_sql = CONVERSATION_SQL
+                else:
+                    write_sql, delete_sql = WRITE_SQL[table]
+                if value is None:
+                    await conn.execute(delete_sql, tuple(ids))
+                else:
+                    await conn.execute(write_sql, (*ids, value))
+            await conn.commit()
+            self._written.update(pending)
+            self.batches += 1
+            self.rows_written += len(pending)
+
+    # ---------- o'qish ----------
+
+    async def get_user_data(self) -> dict:
+        rows = await self._rows("SELECT user_id, data FROM user_data")
+        self._written.update((('user_data', user_id), data) for user_id, data in rows)
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    async def get_chat_data(self) -> dict:
+        rows = await self._rows("SELECT chat_id, data FROM chat_data")
+        self._written.update((('chat_data', chat_id), data) for chat_id, data in rows)
+        return {chat_id: json.loads(data) for chat_id, data in rows}
+
+    async def get_bot_data(self) -> dict:
+        rows = await self._rows("SELECT data FROM bot_data WHERE id = 1")
+        if rows:
+            self._written[('bot_data', 1)] = rows[0][0]
+        return json.loads(rows[0][0]) if rows else {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        conn = await self._db()
+        cursor = await conn.execute(
+            "SELECT key, state FROM conversations WHERE name = ?", (name,)
+        )
+        rows = await cursor.fetchall()
+        self._written.update((('conversations', name, key), state) for key, state in rows)
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    # ---------- yangilash (PTB update_interval da chaqiradi) ----------
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._stage(('user_data', user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._stage(('chat_data', chat_id), data)
+
+    async def update_bot_data(self, data: dict) -> None:
+        self._stage(('bot_data', 1), data)
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        self._stage(('conversations', name, json.dumps(list(key))), new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage(('user_data', user_id), None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage(('chat_data', chat_id), None)
+
+    # Bitta bot jarayoni - tashqaridan o'zgarmaydi
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """To'xtashda qolgan yozuvlarni saqlash va ulanishni yopish"""
+        if self._writer is not None:
+            await self._writer
+        await self._write_pending()
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        logger.info(f"💾 Persistence: {self.batches} ta commit, {self.rows_written} ta yozuv")
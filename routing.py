@@ -0,0 +1,51 @@
+"""
+Group routing for Talaba Bot
+Telegram group -> floors derived from floors.group_id, shared by bot and admin panel
+"""
+
+import supervisors
+
+FLOOR_GROUPS_SQL = "SELECT id, group_id FROM floors ORDER BY id"
+
+
+def floors_label(floors: list) -> str:
+    """[2, 3] -> '2-3', [5] -> '5', [2, 5] -> '2,5', [2..9, 12, 13] -> '2-9,12-13'"""
+    runs = []
+    for floor in sorted(floors):
+        if runs and floor == runs[-1][1] + 1:
+            runs[-1][1] = floor
+        else:
+            runs.append([floor, floor])
+    return ','.join(str(a) if a == b else f"{a}-{b}" for a, b in runs)
+
+
+def build_routes(rows) -> dict:
+    """(floor, group_id) qatorlaridan {'groups': [...], 'unassigned': [...]}"""
+    by_group = {}
+    unassigned = []
+    for floor, group_id in rows:
+        if group_id:
+            by_group.setdefault(group_id, []).append(floor)
+        else:
+            unassigned.append(floor)
+
+    groups = [
+        {"group_id": group_id, "floors": floors, "label": floors_label(floors)}
+        for group_id, floors in by_group.items()
+    ]
+    groups.sort(key=lambda g: g['floors'][0])
+    return {"groups": groups, "unassigned": unassigned}
+
+
+def select(routes: dict, target: str = 'all') -> list:
+    """'all' yoki '2-3' / '2,5' qavatlariga tegishli guruhlar"""
+    if not target or target == 'all':
+        return routes['groups']
+    wanted = set(supervisors.parse_floors(target))
+    return [g for g in routes['groups'] if wanted.intersection(g['floors'])]
+
+
+async def load(conn) -> dict:
+    """Marshrut jadvali - bitta so'rov"""
+    cursor = await conn.execute(FLOOR_GROUPS_SQL)
+    return build_routes(tuple(row) for row in await cursor.fetchall())
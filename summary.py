@@ -0,0 +1,30 @@
+"""
+Daily report counters for Talaba Bot
+daily_summary rows are kept current by triggers, so reports read one row instead of rescanning
+"""
+
+from migrations import SUMMARY_ALL
+
+COUNTERS = ('duties', 'completed', 'attendance_floors', 'students', 'penalties')
+
+# Kun qatori va umumiy qator - bitta so'rov
+SUMMARY_SQL = "SELECT * FROM daily_summary WHERE date IN (?, ?)"
+
+
+def build(rows, day: str) -> dict:
+    """Kun hisoblagichlari + pending, completion_rate va total_penalties"""
+    by_date = {row['date']: dict(row) for row in rows}
+    result = {col: by_date.get(day, {}).get(col, 0) for col in COUNTERS}
+    result['date'] = day
+    result['pending'] = result['duties'] - result['completed']
+    result['completion_rate'] = (
+        round(result['completed'] / result['duties'] * 100) if result['duties'] > 0 else 0
+    )
+    result['total_penalties'] = by_date.get(SUMMARY_ALL, {}).get('penalties', 0)
+    return result
+
+
+async def load(conn, day: str) -> dict:
+    """Kunlik hisoblagichlar"""
+    cursor = await conn.execute(SUMMARY_SQL, (day, SUMMARY_ALL))
+    return build(await cursor.fetchall(), day)
@@ -0,0 +1,69 @@
+"""
+Floor supervisor storage for Talaba Bot
+supervisor_floors junction table kept in sync with floor_supervisors
+"""
+
+# telegram_id bo'yicha upsert - id o'zgarmaydi (INSERT OR REPLACE dan farqli)
+UPSERT_SQL = """
+    INSERT INTO floor_supervisors (telegram_id, name, floors)
+    VALUES (?, ?, ?)
+    ON CONFLICT (telegram_id) DO UPDATE SET name = excluded.name, floors = excluded.floors
+"""
+
+ID_SQL = "SELECT id FROM floor_supervisors WHERE telegram_id = ?"
+
+CLEAR_FLOORS_SQL = "DELETE FROM supervisor_floors WHERE supervisor_id = ?"
+
+INSERT_FLOOR_SQL = "INSERT OR IGNORE INTO supervisor_floors (supervisor_id, floor) VALUES (?, ?)"
+
+DELETE_SQL = "DELETE FROM floor_supervisors WHERE id = ?"
+
+FLOORS_OF_SQL = """
+    SELECT sf.floor FROM supervisor_floors sf
+    JOIN floor_supervisors s ON s.id = sf.supervisor_id
+    WHERE s.telegram_id = ?
+    ORDER BY sf.floor
+"""
+
+OWNER_OF_SQL = """
+    SELECT s.* FROM supervisor_floors sf
+    JOIN floor_supervisors s ON s.id = sf.supervisor_id
+    WHERE sf.floor = ?
+    ORDER BY s.id
+    LIMIT 1
+"""
+
+
+def parse_floors(floors: str) -> list:
+    """'2,3' / '2, 3' / '2-3' -> [2, 3]"""
+    result = []
+    for part in (floors or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            result.extend(range(int(start), int(end) + 1))
+        else:
+            result.append(int(part))
+    return sorted(set(result))
+
+
+def format_floors(floors: list) -> str:
+    return ','.join(str(f) for f in floors)
+
+
+async def save(conn, telegram_id: str, name: str, floors: str) -> int:
+    """Sardorni saqlash - supervisor id qaytaradi"""
+    floor_list = parse_floors(floors)
+    await conn.execute(UPSERT_SQL, (telegram_id, name, format_floors(floor_list)))
+    cursor = await conn.execute(ID_SQL, (telegram_id,))
+    supervisor_id = (await cursor.fetchone())[0]
+    await conn.execute(CLEAR_FLOORS_SQL, (supervisor_id,))
+    await conn.executemany(INSERT_FLOOR_SQL, [(supervisor_id, f) for f in floor_list])
+    return supervisor_id
+
+
+async def delete(conn, supervisor_id: int):
+    await conn.execute(CLEAR_FLOORS_SQL, (supervisor_id,))
+    await conn.execute(DELETE_SQL, (supervisor_id,))
@@ -0,0 +1,80 @@
+"""
+Tenant (dormitory) configuration for Talaba Bot
+One SQLite file per dormitory, shared by bot and admin panel
+"""
+
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+
+DEFAULT_TENANT = 'default'
+DEFAULT_DATABASE_PATH = 'talaba.db'
+
+_current = contextvars.ContextVar('tenant', default=None)
+_configs = None
+
+
+def _load() -> dict:
+    """TENANTS_FILE (JSON ro'yxat) yoki bitta standart yotoqxona"""
+    path = os.getenv('TENANTS_FILE')
+    if not path:
+        return {DEFAULT_TENANT: {"id": DEFAULT_TENANT, "name": "Talaba", "db": DEFAULT_DATABASE_PATH}}
+
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    configs = {}
+    for entry in entries:
+        tenant_id = str(entry['id'])
+        configs[tenant_id] = {
+            "id": tenant_id,
+            "name": entry.get('name', tenant_id),
+            "db": entry.get('db', f"talaba_{tenant_id}.db"),
+            "admin_id": str(entry['admin_id']) if entry.get('admin_id') else None,
+        }
+    if not configs:
+        raise ValueError(f"{path}: yotoqxonalar ro'yxati bo'sh")
+    return configs
+
+
+def configs() -> dict:
+    """{tenant_id: {id, name, db, admin_id}} - birinchi chaqiruvda o'qiladi"""
+    global _configs
+    if _configs is None:
+        _configs = _load()
+    return _configs
+
+
+def ids() -> list:
+    return list(configs())
+
+
+def default_id() -> str:
+    return ids()[0]
+
+
+def admin_id(tenant_id: str) -> str:
+    """Yotoqxona admini (ko'rsatilmagan bo'lsa - ADMIN_ID)"""
+    return configs()[tenant_id].get('admin_id') or os.getenv('ADMIN_ID')
+
+
+def current_id() -> str:
+    """Joriy so'rov/ish yotoqxonasi"""
+    return _current.get() or default_id()
+
+
+def set_current(tenant_id: str):
+    """Joriy kontekst uchun yotoqxonani tanlash"""
+    if tenant_id not in configs():
+        raise KeyError(f"Noma'lum yotoqxona: {tenant_id}")
+    return _current.set(tenant_id)
+
+
+@contextmanager
+def use(tenant_id: str):
+    """with tenants.use('blok_b'): ... - blok ichida boshqa yotoqxona"""
+    token = set_current(tenant_id)
+    try:
+        yield configs()[tenant_id]
+    finally:
+        _current.reset(token)
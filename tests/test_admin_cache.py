@@ -0,0 +1,47 @@
+"""
+admin.py - ETag/304 shartli javoblar va ma'lumot o'zgarganda yangilanish
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admin
+import database as db
+import tenants
+
+
+@pytest.fixture
+def panel(tmp_path, monkeypatch):
+    """Vaqtinchalik bazali admin panel (fon ishlari va Telegram botisiz)"""
+    monkeypatch.setattr(tenants, '_configs', {
+        tenants.DEFAULT_TENANT: {"id": tenants.DEFAULT_TENANT, "name": "Test",
+                                 "db": str(tmp_path / 'talaba.db')},
+    })
+    monkeypatch.setattr(db, '_states', {})
+    monkeypatch.setattr(admin, 'BOT_TOKEN', '')
+    monkeypatch.setenv('JOB_WORKER', '0')
+
+
+def test_page_is_revalidated_until_data_changes(panel):
+    async def run():
+        async with admin.app.test_app() as test_app:
+            client = test_app.test_client()
+            first = await client.get('/guruhlar')
+            etag = first.headers['ETag']
+            cached = await client.get('/guruhlar', headers={'If-None-Match': etag})
+
+            response = await client.post('/save_group', form={'floors': '2-3', 'group_id': '-100123'})
+            assert (await response.get_json())['success']
+            changed = await client.get('/guruhlar', headers={'If-None-Match': etag})
+            body = (await changed.get_data()).decode()
+            return first.status_code, cached.status_code, changed.status_code, changed.headers['ETag'], etag, body
+
+    first, cached, changed, new_etag, etag, body = asyncio.run(run())
+    assert (first, cached, changed) == (200, 304, 200)
+    assert new_etag != etag
+    assert '-100123' in body
@@ -0,0 +1,34 @@
+"""
+attendance.parse_bulk - bitta xabarda bir nechta qavat davomati
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance
+
+
+def test_parse_bulk_with_notes():
+    entries = attendance.parse_bulk("2:48, 3 : 51 (202 Botirov; 305)", ['2', '3'])
+    assert entries == [(2, 48, None), (3, 51, "202 Botirov; 305")]
+
+
+def test_looks_like_bulk():
+    assert attendance.looks_like_bulk("2:48")
+    assert not attendance.looks_like_bulk("48")
+    assert not attendance.looks_like_bulk("")
+
+
+@pytest.mark.parametrize("text, error", [
+    ("2:48 4:30", "4-qavat sizga biriktirilmagan"),
+    ("2:48 2:50", "2-qavat ikki marta yozilgan"),
+    ("2:48 salom", "Tushunarsiz qism"),
+    ("   ", "Davomat topilmadi"),
+])
+def test_parse_bulk_rejects(text, error):
+    with pytest.raises(ValueError, match=error):
+        attendance.parse_bulk(text, [2, 3])
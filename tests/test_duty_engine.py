@@ -0,0 +1,67 @@
+"""
+duty_engine.py - navbat rejasi, ustuvorlik (queue > jazo > aylanish) va idempotentlik
+"""
+
+import asyncio
+import os
+import sys
+from collections import deque
+from datetime import date
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import duty_engine
+import migrations
+import topology
+
+DAY = date(2026, 3, 2)
+
+
+def test_rotation_differs_per_floor():
+    sequences = {2: [201, 202, 203, 204], 3: [301, 302, 303, 304]}
+    rows, used = duty_engine.plan(sequences, set(), {}, {}, DAY, 1)
+
+    assert used == []
+    assert [(floor, room // 100) for _, room, floor in rows] == [(2, 2), (3, 3)]
+    assert rows[0][1] % 100 != rows[1][1] % 100
+
+
+def test_queue_then_penalty_then_rotation():
+    sequences = {2: [201, 202, 203, 204]}
+    queue = {2: deque([(7, 203)])}
+    penalties = {2: [(204, '2026-03-02', '2026-03-04')]}
+    rows, used = duty_engine.plan(sequences, set(), queue, penalties, DAY, 4)
+
+    rooms = [room for _, room, _ in rows]
+    # 1-kun queue, keyin jazo tugaguncha (end_date kirmaydi), so'ng oddiy aylanish
+    assert rooms[:3] == [203, 204, 204]
+    assert rooms[3] == duty_engine.rotation_room(sequences[2], 2, date(2026, 3, 5))
+    assert used == [('2026-03-02', 7)]
+
+
+def test_existing_days_are_skipped():
+    sequences = {2: [201, 202], 3: [301, 302]}
+    existing = {('2026-03-02', 2)}
+    rows, _ = duty_engine.plan(sequences, existing, {}, {}, DAY, 1)
+
+    assert [(day, floor) for day, _, floor in rows] == [('2026-03-02', 3)]
+
+
+def test_generate_is_idempotent(tmp_path):
+    async def run():
+        async with aiosqlite.connect(str(tmp_path / 'duty.db')) as conn:
+            await migrations.ensure(conn)
+            await topology.add_building(conn, 'A', [2, 3], 4)
+            await conn.commit()
+
+            first = await duty_engine.generate(conn, DAY, 7)
+            second = await duty_engine.generate(conn, DAY, 7)
+            cursor = await conn.execute("SELECT COUNT(*) FROM duty_schedule")
+            return first, second, (await cursor.fetchone())[0]
+
+    first, second, total = asyncio.run(run())
+    assert first == 2 * 7
+    assert second == 0
+    assert total == 2 * 7
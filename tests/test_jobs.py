@@ -0,0 +1,124 @@
+"""
+jobs.py - navbat, uzilgan ishlarni qaytarish va urinishlar chegarasi
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs
+import migrations
+
+
+def run_with_db(tmp_path, scenario):
+    """scenario(connect) ni migratsiya qilingan vaqtinchalik bazada bajarish"""
+    path = str(tmp_path / 'jobs.db')
+
+    @asynccontextmanager
+    async def connect():
+        async with aiosqlite.connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+            yield conn
+
+    async def main():
+        async with connect() as conn:
+            await migrations.ensure(conn)
+        return await scenario(connect)
+
+    return asyncio.run(main())
+
+
+def test_claim_and_finish(tmp_path):
+    async def scenario(connect):
+        async with connect() as conn:
+            job_id = await jobs.enqueue(conn, 'send', {"text": "salom"})
+            job = await jobs.claim_next(conn, 'w1')
+            assert await jobs.claim_next(conn, 'w2') is None
+            await jobs.finish(conn, job_id, result={"sent": 1})
+            return job, await jobs.get_job(conn, job_id)
+
+    claimed, done = run_with_db(tmp_path, scenario)
+    assert claimed['payload'] == {"text": "salom"}
+    assert done['status'] == jobs.DONE
+    assert done['result'] == {"sent": 1}
+    assert done['attempts'] == 1
+
+
+def test_interrupted_job_is_requeued_after_restart(tmp_path, monkeypatch):
+    async def scenario(connect):
+        async with connect() as conn:
+            job_id = await jobs.enqueue(conn, 'send')
+            await jobs.claim_next(conn, 'old-process')
+            # Heartbeat hali yangi - tegilmaydi
+            fresh = await jobs.requeue_stale(conn)
+            # Jarayon o'ldi: heartbeat endi yangilanmaydi
+            monkeypatch.setattr(jobs, 'JOB_STALE_SECONDS', -1)
+            stale = await jobs.requeue_stale(conn)
+            return fresh, stale, await jobs.get_job(conn, job_id)
+
+    fresh, stale, job = run_with_db(tmp_path, scenario)
+    assert fresh == (0, 0)
+    assert stale == (1, 0)
+    assert job['status'] == jobs.QUEUED
+    assert job['worker'] is None
+
+
+def test_poison_job_stops_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_STALE_SECONDS', -1)
+    monkeypatch.setattr(jobs, 'JOB_MAX_ATTEMPTS', 2)
+
+    async def scenario(connect):
+        async with connect() as conn:
+            job_id = await jobs.enqueue(conn, 'crash')
+            rounds = []
+            for _ in range(3):
+                if await jobs.claim_next(conn, 'w') is None:
+                    break
+                rounds.append(await jobs.requeue_stale(conn))
+            return rounds, await jobs.get_job(conn, job_id)
+
+    rounds, job = run_with_db(tmp_path, scenario)
+    assert rounds == [(1, 0), (0, 1)]
+    assert job['status'] == jobs.FAILED
+    assert job['attempts'] == 2
+
+
+def test_worker_runs_queued_jobs(tmp_path):
+    async def scenario(connect):
+        seen = []
+
+        async def handler(payload):
+            seen.append(payload['n'])
+            return {"ok": True}
+
+        async def failing(payload):
+            raise RuntimeError("yiqildi")
+
+        async with connect() as conn:
+            ok_id = await jobs.enqueue(conn, 'ok', {"n": 1})
+            bad_id = await jobs.enqueue(conn, 'bad')
+            unknown_id = await jobs.enqueue(conn, 'nope')
+
+        worker = jobs.JobWorker(connect, {'ok': handler, 'bad': failing}, poll_interval=0.01)
+        worker.start()
+        for _ in range(200):
+            async with connect() as conn:
+                cursor = await conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (jobs.QUEUED,))
+                if (await cursor.fetchone())[0] == 0:
+                    break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+        async with connect() as conn:
+            return seen, [await jobs.get_job(conn, i) for i in (ok_id, bad_id, unknown_id)]
+
+    seen, (ok, bad, unknown) = run_with_db(tmp_path, scenario)
+    assert seen == [1]
+    assert ok['status'] == jobs.DONE and ok['result'] == {"ok": True}
+    assert bad['status'] == jobs.FAILED and bad['error'] == "yiqildi"
+    assert unknown['status'] == jobs.FAILED
@@ -0,0 +1,94 @@
+"""
+migrations.py - dastlabki (baseline) bazani oxirgi versiyagacha yangilash
+"""
+
+import asyncio
+import os
+import sys
+
+import aiosqlite
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+
+# Birinchi relizdagi database.init_db sxemasi; attendance - notes ustunisiz (eski admin panel)
+BASELINE_SCHEMA = [
+    "CREATE TABLE floors (id INTEGER PRIMARY KEY, group_id TEXT, supervisor_id TEXT, supervisor_name TEXT)",
+    "CREATE TABLE rooms (number INTEGER PRIMARY KEY, floor INTEGER, duty_days INTEGER DEFAULT 1)",
+    """CREATE TABLE duty_schedule (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, room_number INTEGER,
+           floor INTEGER, status TEXT DEFAULT 'pending', confirmed_by TEXT, confirmed_at TEXT)""",
+    """CREATE TABLE penalties (id INTEGER PRIMARY KEY AUTOINCREMENT, room_number INTEGER, type TEXT,
+           reason TEXT, start_date TEXT, end_date TEXT, issued_by TEXT,
+           created_at TEXT DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE floor_supervisors (id INTEGER PRIMARY KEY AUTOINCREMENT, telegram_id TEXT UNIQUE,
+           name TEXT, floors TEXT)""",
+    """CREATE TABLE attendance (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, floor INTEGER,
+           student_count INTEGER, submitted_by TEXT, submitted_at TEXT)""",
+    """CREATE TABLE duty_queue (id INTEGER PRIMARY KEY AUTOINCREMENT, floor INTEGER, room_number INTEGER,
+           reason TEXT, skipped_by TEXT, created_at TEXT DEFAULT CURRENT_TIMESTAMP)""",
+]
+
+
+def upgrade(tmp_path, scenario):
+    """Baseline bazani yaratib, scenario(conn) ni bajarish"""
+    async def run():
+        async with aiosqlite.connect(str(tmp_path / 'baseline.db')) as conn:
+            for sql in BASELINE_SCHEMA:
+                await conn.execute(sql)
+            await conn.executemany("INSERT INTO floors (id) VALUES (?)", [(2,), (3,), (4,), (5,)])
+            await conn.executemany("INSERT INTO rooms (number, floor) VALUES (?, ?)",
+                                   [(201, 2), (206, 2), (301, 3), (401, 4), (501, 5)])
+            # Eski kodda bir kunga ikki marta yozilgan navbat
+            await conn.executemany("INSERT INTO duty_schedule (date, room_number, floor) VALUES (?, ?, ?)",
+                                   [('2026-03-02', 201, 2), ('2026-03-02', 206, 2)])
+            await conn.executemany("INSERT INTO floor_supervisors (telegram_id, name, floors) VALUES (?, ?, ?)",
+                                   [('11', 'Ali', '2,3'), ('12', 'Vali', '4-5')])
+            await conn.commit()
+            return await scenario(conn)
+
+    return asyncio.run(run())
+
+
+def test_baseline_upgrades_to_latest(tmp_path):
+    async def scenario(conn):
+        version = await migrations.ensure(conn)
+        again = await migrations.ensure(conn)
+
+        cursor = await conn.execute("SELECT room_number FROM duty_schedule")
+        duties = [row[0] for row in await cursor.fetchall()]
+        cursor = await conn.execute(
+            "SELECT telegram_id, floor FROM supervisor_floors JOIN floor_supervisors ON id = supervisor_id "
+            "ORDER BY telegram_id, floor")
+        floors = [tuple(row) for row in await cursor.fetchall()]
+        cursor = await conn.execute("PRAGMA table_info(attendance)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        cursor = await conn.execute("SELECT number FROM rooms WHERE general_cleaning = 1 ORDER BY number")
+        general = [row[0] for row in await cursor.fetchall()]
+        return version, again, duties, floors, columns, general
+
+    version, again, duties, floors, columns, general = upgrade(tmp_path, scenario)
+    assert version == again == migrations.LATEST_VERSION
+    assert duties == [201]
+    assert floors == [('11', 2), ('11', 3), ('12', 4), ('12', 5)]
+    assert 'notes' in columns
+    assert general == [201, 206, 301, 401, 501]
+
+
+def test_user_version_fast_path_never_goes_back(tmp_path):
+    async def scenario(conn):
+        before = await migrations.is_current(conn)
+        await migrations.ensure(conn)
+        await migrations.mark_current(conn)
+        after = await migrations.is_current(conn)
+
+        # Yangiroq build yozgan versiya - eski build uni pasaytirmaydi
+        await conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 5}")
+        await migrations.mark_current(conn)
+        cursor = await conn.execute("PRAGMA user_version")
+        return before, after, (await cursor.fetchone())[0]
+
+    before, after, user_version = upgrade(tmp_path, scenario)
+    assert not before
+    assert after
+    assert user_version == migrations.LATEST_VERSION + 5
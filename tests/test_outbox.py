@@ -0,0 +1,94 @@
+"""
+outbox.py - ustuvorlik, chat limitlari va RetryAfter dan keyin qayta urinish
+"""
+
+import asyncio
+import os
+import sys
+
+from telegram.error import RetryAfter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import outbox
+
+
+class FakeBot:
+    """send_message chaqiruvlarini yozib boradi; fail_first - birinchi urinishlarda xato"""
+
+    def __init__(self, fail_first=()):
+        self.sent = []
+        self.calls = 0
+        self.fail_first = list(fail_first)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls += 1
+        if self.fail_first:
+            raise self.fail_first.pop(0)
+        self.sent.append((chat_id, text))
+        return text
+
+
+def run_outbox(scenario, **kwargs):
+    async def main():
+        scheduler = outbox.OutboundScheduler(**kwargs)
+        scheduler.start()
+        try:
+            return await scenario(scheduler)
+        finally:
+            await scheduler.stop()
+
+    return asyncio.run(main())
+
+
+def test_admin_lane_jumps_queued_reminders():
+    bot = FakeBot()
+
+    async def scenario(scheduler):
+        sends = [scheduler.send_message(bot, 100 + i, f"eslatma {i}", outbox.REMINDER) for i in range(5)]
+        sends.append(scheduler.send_message(bot, 1, "hisobot", outbox.ADMIN))
+        await asyncio.gather(*sends)
+        return scheduler.stats()
+
+    stats = run_outbox(scenario)
+    assert bot.sent[0] == (1, "hisobot")
+    assert stats['lanes']['reminder']['sent'] == 5
+    assert stats['lanes']['admin']['sent'] == 1
+
+
+def test_busy_chat_does_not_block_others():
+    bot = FakeBot()
+
+    async def scenario(scheduler):
+        await asyncio.gather(
+            scheduler.send_message(bot, 1, "a1"),
+            scheduler.send_message(bot, 1, "a2"),
+            scheduler.send_message(bot, 2, "b1"),
+        )
+
+    run_outbox(scenario)
+    # Shaxsiy chat - soniyasiga 1 ta; a2 kechiktiriladi, b1 kutmaydi
+    assert [text for _, text in bot.sent] == ["a1", "b1", "a2"]
+
+
+def test_retry_after_resends_message():
+    bot = FakeBot(fail_first=[RetryAfter(0.05)])
+
+    async def scenario(scheduler):
+        result = await scheduler.send_message(bot, -100, "salom")
+        return result, scheduler.stats()
+
+    result, stats = run_outbox(scenario)
+    assert result == "salom"
+    assert bot.calls == 2
+    assert stats['lanes']['notify']['sent'] == 1
+    assert stats['lanes']['notify']['failed'] == 0
+
+
+def test_send_many_keeps_order_and_errors():
+    bot = FakeBot(fail_first=[ValueError("blocked")])
+    # Modul darajasidagi outbox ishga tushmagan - to'g'ridan-to'g'ri yuboriladi
+    results = asyncio.run(outbox.send_many(bot, [(-1, "x"), (-2, "y", {"disable_notification": True})]))
+
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "y"
@@ -0,0 +1,38 @@
+"""
+daily_summary triggers - davomatni qayta yuborish hisoblagichlarni buzmasligi kerak
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+import tenants
+
+
+@pytest.fixture
+def tenant_db(tmp_path, monkeypatch):
+    """Vaqtinchalik bazali bitta yotoqxona"""
+    monkeypatch.setattr(tenants, '_configs', {
+        tenants.DEFAULT_TENANT: {"id": tenants.DEFAULT_TENANT, "name": "Test",
+                                 "db": str(tmp_path / 'talaba.db')},
+    })
+    monkeypatch.setattr(db, '_states', {})
+    asyncio.run(db.init_db())
+
+
+def test_resubmitted_attendance_updates_summary(tenant_db):
+    async def run():
+        await db.save_attendance(2, 40, 'a')
+        await db.save_attendance(2, 45, 'a')
+        await db.save_attendance_bulk([(2, 47, None), (3, 51, '302 Botirov')], 'a')
+        return await db.get_daily_summary(), await db.get_today_attendance()
+
+    daily, rows = asyncio.run(run())
+    assert daily['attendance_floors'] == 2
+    assert daily['students'] == 47 + 51
+    assert [(row['floor'], row['student_count']) for row in rows] == [(2, 47), (3, 51)]
@@ -0,0 +1,69 @@
+"""
+update_processor.py - turli chatlar parallel, bitta chat ichida kelgan tartibda
+"""
+
+import asyncio
+import os
+import sys
+
+from telegram import Chat, Message, Update
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from update_processor import ChatOrderedUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, None, chat, text=str(update_id)))
+
+
+def test_chat_order_kept_while_chats_overlap():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(4)
+        log = []
+        running = set()
+        overlap = []
+
+        async def handle(update_id, chat_id, delay):
+            running.add(chat_id)
+            overlap.append(len(running))
+            await asyncio.sleep(delay)
+            log.append((chat_id, update_id))
+            running.discard(chat_id)
+
+        # 1-chatning birinchi update i sekin - ikkinchisi undan o'zib ketmasligi kerak
+        plan = [(1, 1, 0.05), (2, 1, 0.0), (3, 2, 0.01)]
+        await asyncio.gather(*[
+            processor.do_process_update(make_update(update_id, chat_id), handle(update_id, chat_id, delay))
+            for update_id, chat_id, delay in plan
+        ])
+        return log, max(overlap), processor
+
+    log, overlap, processor = asyncio.run(main())
+    assert [update_id for chat_id, update_id in log if chat_id == 1] == [1, 2]
+    assert log[0] == (2, 3)
+    assert overlap == 2
+    assert processor.max_chat_queue == 2
+    assert processor._locks == {}
+
+
+def test_concurrency_limit():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(2)
+        active = 0
+        peak = 0
+
+        async def handle():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        await asyncio.gather(*[
+            processor.do_process_update(make_update(i, 100 + i), handle()) for i in range(6)
+        ])
+        return peak
+
+    assert asyncio.run(main()) == 2
@@ -0,0 +1,121 @@
+"""
+Building topology for Talaba Bot
+Buildings, floors and rooms loaded once from the DB, shared by bot and admin panel
+"""
+
+# Birinchi ishga tushirishdagi bino (2-9 qavatlar, 12 tadan xona)
+DEFAULT_BUILDING = {
+    "name": "Asosiy bino",
+    "floors": list(range(2, 10)),
+    "rooms_per_floor": 12,
+    # Shu xonalarda yashovchilar 5 ta - glavni uborka qiladi
+    "general_cleaning": (1, 6, 7, 12),
+}
+
+BUILDINGS_SQL = "SELECT id, name FROM buildings ORDER BY id"
+
+FLOORS_SQL = "SELECT id, building_id FROM floors ORDER BY id"
+
+ROOMS_SQL = "SELECT number, floor, duty_days, general_cleaning FROM rooms ORDER BY floor, number"
+
+INSERT_BUILDING_SQL = "INSERT INTO buildings (name) VALUES (?)"
+
+INSERT_FLOOR_SQL = "INSERT INTO floors (id, building_id, group_id) VALUES (?, ?, ?)"
+
+INSERT_ROOM_SQL = """
+    INSERT INTO rooms (number, floor, duty_days, general_cleaning)
+    VALUES (?, ?, ?, ?)
+"""
+
+# Xona raqami = qavat*100 + tartib - qavatda 99 tadan ortiq xona bo'lsa keyingi qavatga o'tadi
+MAX_ROOMS_PER_FLOOR = 99
+
+
+class Topology:
+    """Xotiradagi bino/qavat/xona tuzilmasi"""
+
+    def __init__(self, buildings, floors, rooms):
+        self.buildings = {b_id: {"id": b_id, "name": name, "floors": []} for b_id, name in buildings}
+        self.building_of = {}
+        for floor, building_id in floors:
+            self.building_of[floor] = building_id
+            if building_id in self.buildings:
+                self.buildings[building_id]['floors'].append(floor)
+        self.floors = [floor for floor, _ in floors]
+
+        self.rooms = {}
+        self.floor_rooms = {floor: [] for floor in self.floors}
+        for number, floor, duty_days, general_cleaning in rooms:
+            self.rooms[number] = {
+                "number": number,
+                "floor": floor,
+                "duty_days": duty_days or 1,
+                "general_cleaning": bool(general_cleaning),
+            }
+            self.floor_rooms.setdefault(floor, []).append(number)
+
+    @property
+    def floor_count(self) -> int:
+        return len(self.floors)
+
+    def building_list(self) -> list:
+        """[{id, name, floors, rooms}] - panel va bot matnlari uchun"""
+        return [
+            dict(building, rooms=sum(len(self.floor_rooms.get(f, [])) for f in building['floors']))
+            for building in self.buildings.values()
+        ]
+
+    def floor_of(self, room_number: int):
+        room = self.rooms.get(room_number)
+        return room['floor'] if room else None
+
+    def is_general_cleaning(self, room_number: int) -> bool:
+        room = self.rooms.get(room_number)
+        return bool(room and room['general_cleaning'])
+
+    def next_room(self, floor: int, current_room: int):
+        """Qavatdagi keyingi xona (oxiridan keyin - birinchisi)"""
+        numbers = self.floor_rooms.get(floor) or []
+        if current_room in numbers:
+            return numbers[(numbers.index(current_room) + 1) % len(numbers)]
+        return numbers[0] if numbers else None
+
+
+def building_rows(floors: list, rooms_per_floor: int, general_cleaning=()) -> list:
+    """(xona, qavat, duty_days, glavni) qatorlari - xona raqami = qavat*100 + tartib"""
+    if not 1 <= rooms_per_floor <= MAX_ROOMS_PER_FLOOR:
+        raise ValueError(f"Qavatdagi xonalar soni 1-{MAX_ROOMS_PER_FLOOR} oralig'ida bo'lishi kerak")
+    return [
+        (floor * 100 + idx, floor, 1, int(idx in general_cleaning))
+        for floor in floors
+        for idx in range(1, rooms_per_floor + 1)
+    ]
+
+
+async def add_building(conn, name: str, floors: list, rooms_per_floor: int,
+                       general_cleaning=(), group_ids: dict = None) -> int:
+    """Yangi bino - qavat raqamlari butun tizimda yagona bo'lishi kerak (aks holda ValueError)"""
+    rows = building_rows(floors, rooms_per_floor, general_cleaning)
+    # Qavat raqami (va xonalar) band - jimgina tashlab yubormasdan rad etamiz;
+    # bir xil raqamli boshqa blok - alohida yotoqxona (TENANTS_FILE)
+    placeholders = ", ".join("?" * len(floors))
+    cursor = await conn.execute(f"SELECT id FROM floors WHERE id IN ({placeholders})", list(floors))
+    taken = sorted(row[0] for row in await cursor.fetchall())
+    if taken:
+        raise ValueError(f"Qavatlar allaqachon mavjud: {', '.join(map(str, taken))}")
+
+    cursor = await conn.execute(INSERT_BUILDING_SQL, (name,))
+    building_id = cursor.lastrowid
+    group_ids = group_ids or {}
+    await conn.executemany(INSERT_FLOOR_SQL, [(f, building_id, group_ids.get(f)) for f in floors])
+    await conn.executemany(INSERT_ROOM_SQL, rows)
+    return building_id
+
+
+async def load(conn) -> Topology:
+    """Tuzilmani yuklash"""
+    rows = []
+    for sql in (BUILDINGS_SQL, FLOORS_SQL, ROOMS_SQL):
+        cursor = await conn.execute(sql)
+        rows.append([tuple(r) for r in await cursor.fetchall()])
+    return Topology(*rows)
@@ -0,0 +1,71 @@
+"""
+Concurrent update processing for Talaba Bot
+Updates run in parallel up to a cap, but one chat's updates stay in arrival order
+"""
+
+import asyncio
+import os
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Bir vaqtda ishlanadigan update lar soni (1 - ketma-ket, eski xatti-harakat)
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '16'))
+
+# PTB semaforasi (process_update da, chat navbatidan oldin olinadi) - amalda cheklamaydi;
+# haqiqiy chegara UPDATE_CONCURRENCY chat qulfidan keyin qo'llaniladi
+BASE_CAP = 4096
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Turli chatlar parallel, bitta chat ichida - kelgan tartibda (ConversationHandler uchun)"""
+
+    def __init__(self, max_concurrent_updates: int):
+        # Bitta chat navbatida kutayotganlar boshqa chatlarning o'rnini egallamasin
+        super().__init__(max(BASE_CAP, max_concurrent_updates))
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._locks = {}
+        self._waiting = {}
+        self.max_chat_queue = 0
+
+    @staticmethod
+    def ordering_key(update: object):
+        """Chat (bo'lmasa foydalanuvchi) - shu kalit bo'yicha update lar navbatda"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        key = self.ordering_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        self.max_chat_queue = max(self.max_chat_queue, self._waiting[key])
+        try:
+            # asyncio.Lock navbati FIFO - chat ichidagi tartib saqlanadi;
+            # slot faqat navbat kelgandan keyin olinadi
+            async with lock, self._slots:
+                await coroutine
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._locks.clear()
+        self._waiting.clear()
@@ -0,0 +1,189 @@
+"""
+Local webhook harness for Talaba Bot
+Fake Bot API + recorded updates POSTed to the bot's webhook, with reply latency
+
+Ishlatish:
+    python webhook_harness.py --updates updates.jsonl
+    TELEGRAM_API_URL=http://127.0.0.1:8081 BOT_MODE=webhook \\
+        WEBHOOK_URL=http://127.0.0.1:8443 TELEGRAM_BOT_TOKEN=123:test python bot.py
+
+Harness bot setWebhook chaqirganda manzil va secret ni oladi, so'ng update larni yuboradi.
+"""
+
+import argparse
+import itertools
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import requests
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Talaba Bot", "username": "talaba_test_bot"}
+
+# Javobi xabar bo'ladigan metodlar (kechikish shular bo'yicha o'lchanadi)
+REPLY_METHODS = {'sendMessage', 'editMessageText'}
+
+
+def sample_updates(user_id: int = 1001) -> list:
+    """Fayl berilmasa - oddiy buyruqlar va inline tugma"""
+    user = {"id": user_id, "is_bot": False, "first_name": "Test"}
+    chat = {"id": user_id, "type": "private", "first_name": "Test"}
+
+    def command(text):
+        return {"message": {
+            "message_id": 0, "date": int(time.time()), "chat": chat, "from": user, "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        }}
+
+    return [
+        command("/start"),
+        command("/navbat"),
+        command("/yordam"),
+        {"callback_query": {
+            "id": "1", "from": user, "chat_instance": "1", "data": "today",
+            "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "from": BOT_USER,
+                        "text": "menu"},
+        }},
+    ]
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    """Bot API o'rnini bosuvchi server: setWebhook va javoblarni qayd qiladi"""
+
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _APIHandler)
+        self.webhook = threading.Event()
+        self.webhook_url = None
+        self.secret = None
+        self.replies = {}
+        self.reply_event = threading.Condition()
+        self._message_ids = itertools.count(100)
+
+    def record_reply(self, chat_id):
+        with self.reply_event:
+            self.replies.setdefault(str(chat_id), []).append(time.perf_counter())
+            self.reply_event.notify_all()
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        method = self.path.rsplit('/', 1)[-1]
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        params = self._params(body)
+
+        if method == 'getMe':
+            result = BOT_USER
+        elif method == 'setWebhook':
+            self.server.webhook_url = params.get('url')
+            self.server.secret = params.get('secret_token')
+            self.server.webhook.set()
+            result = True
+        elif method in REPLY_METHODS:
+            chat_id = params.get('chat_id') or 0
+            result = {
+                "message_id": next(self.server._message_ids), "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"}, "from": BOT_USER,
+                "text": params.get('text', ''),
+            }
+            self.server.record_reply(chat_id)
+        else:
+            result = True
+
+        data = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+    def _params(self, body: bytes) -> dict:
+        content_type = self.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            return json.loads(body or b'{}')
+        return dict(parse_qsl(body.decode()))
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def chat_of(update: dict):
+    for key in ('message', 'edited_message', 'callback_query'):
+        if key in update:
+            item = update[key]
+            message = item.get('message', item)
+            return str(message['chat']['id'])
+    return None
+
+
+def replay(api: FakeBotAPI, updates: list, repeat: int, timeout: float) -> list:
+    """Har bir update ni yuborib, shu chatga javob kelguncha vaqtni o'lchash"""
+    session = requests.Session()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": api.secret} if api.secret else {}
+    latencies = []
+    update_ids = itertools.count(1)
+
+    for _ in range(repeat):
+        for update in updates:
+            update = dict(update, update_id=next(update_ids))
+            chat_id = chat_of(update)
+            seen = len(api.replies.get(chat_id, []))
+
+            started = time.perf_counter()
+            response = session.post(api.webhook_url, json=update, headers=headers, timeout=timeout)
+            response.raise_for_status()
+
+            with api.reply_event:
+                got = api.reply_event.wait_for(
+                    lambda: len(api.replies.get(chat_id, [])) > seen, timeout=timeout
+                )
+            if got:
+                latencies.append(api.replies[chat_id][seen] - started)
+            else:
+                print(f"⚠️ update {update['update_id']}: javob kelmadi")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Talaba Bot webhook harness")
+    parser.add_argument('--updates', help="JSONL fayl (har qatorda bitta Update)")
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    updates = load_updates(args.updates) if args.updates else sample_updates()
+    api = FakeBotAPI(('127.0.0.1', args.api_port))
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    print(f"🧪 Soxta Bot API: http://127.0.0.1:{args.api_port} - bot setWebhook kutilmoqda...")
+
+    api.webhook.wait()
+    print(f"🔗 Webhook: {api.webhook_url}")
+    time.sleep(0.5)
+
+    latencies = replay(api, updates, args.repeat, args.timeout)
+    api.shutdown()
+    if not latencies:
+        print("❌ Javoblar yo'q")
+        return
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    print(f"✅ {len(ms)} ta javob: p50={statistics.median(ms):.1f}ms "
+          f"p95={ms[int(len(ms) * 0.95) - 1]:.1f}ms max={ms[-1]:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()